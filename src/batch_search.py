@@ -0,0 +1,67 @@
+import os
+import json
+import time
+import argparse
+from itertools import tee
+from core.config import settings
+from core.telemetry import configure_logging, get_echo, telemetry
+from retrieval.services import MedicalRetriever
+echo = get_echo(__name__)
+
+def read_queries(path: str, field: str='query', id_field: str='id'):
+    with open(path, 'r', encoding='utf-8') as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith('.jsonl'):
+                record = json.loads(line)
+                yield {'id': record.get(id_field, i), 'query': record[field]}
+            else:
+                yield {'id': i, 'query': line}
+
+def to_record(item: dict, docs, with_content: bool=False) -> dict:
+    results = []
+    for doc in docs:
+        result = {'doc_id': doc.metadata.get('doc_id'), 'source': doc.metadata.get('source'), 'page': doc.metadata.get('page'), 'rerank_score': doc.metadata.get('rerank_score'), 'retrieval_score': doc.metadata.get('retrieval_score')}
+        if with_content:
+            result['page_content'] = doc.page_content
+        results.append(result)
+    return {**item, 'results': results}
+
+def run_batch_search(input_path: str, output_path: str='data/batch_search.jsonl', k: int=5, batch_size: int=None, field: str='query', id_field: str='id', filters: dict=None, tenants=None, with_content: bool=False, retriever: MedicalRetriever=None):
+    retriever = retriever if retriever else MedicalRetriever()
+    items, pending = tee(read_queries(input_path, field, id_field))
+    stream = retriever.iter_search_batches((item['query'] for item in pending), k=k, batch_size=batch_size, filters=filters, tenants=tenants)
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    start = time.perf_counter()
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for item, (_, docs) in zip(items, stream):
+            out.write(json.dumps(to_record(item, docs, with_content), ensure_ascii=False, default=float) + '\n')
+            count += 1
+            if count % (batch_size or settings.SEARCH_BATCH_SIZE) == 0:
+                out.flush()
+    elapsed = time.perf_counter() - start
+    echo(f'✅ {count} consultas resueltas en {elapsed:.2f} s ({(count / elapsed if elapsed else 0.0):.1f} consultas/s) → {output_path}')
+    telemetry.flush()
+    return count
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Búsqueda por lotes de MediRAG: consultas desde JSONL/texto, resultados en streaming a JSONL.')
+    parser.add_argument('--input', required=True, help='Fichero .jsonl (un objeto por línea) o de texto (una consulta por línea).')
+    parser.add_argument('--output', default='data/batch_search.jsonl', help='Fichero JSONL de salida; se escribe lote a lote.')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=None, help=f'Consultas por lote (por defecto: {settings.SEARCH_BATCH_SIZE}).')
+    parser.add_argument('--field', default='query', help='Campo con la consulta en cada línea JSONL.')
+    parser.add_argument('--id-field', default='id', help='Campo identificador que se copia a la salida.')
+    parser.add_argument('--filters', type=json.loads, default=None, help='Filtros de payload en JSON, p.ej. \'{"source": "a.pdf", "page": {"gte": 3}}\'.')
+    parser.add_argument('--tenant', action='append', default=None, help='Tenant(s) a consultar; repetible.')
+    parser.add_argument('--with-content', action='store_true', help='Incluye el texto de cada documento en la salida.')
+    return parser.parse_args()
+if __name__ == '__main__':
+    configure_logging()
+    args = parse_args()
+    run_batch_search(args.input, args.output, k=args.k, batch_size=args.batch_size, field=args.field, id_field=args.id_field, filters=args.filters, tenants=args.tenant, with_content=args.with_content)
@@ -0,0 +1,53 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, List
+
+class AsyncMicroBatcher:
+
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]], executor: Executor, max_batch_size: int=32, max_wait_ms: float=5.0):
+        self.batch_fn = batch_fn
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._flush, loop)
+        return await future
+
+    def _flush(self, loop: asyncio.AbstractEventLoop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = (self._pending, [])
+        if batch:
+            task = loop.create_task(self._run(loop, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop: asyncio.AbstractEventLoop, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def mean_batch_size(self) -> float:
+        return self.items / self.batches if self.batches else 0.0
@@ -10,4 +10,85 @@ class Settings:
     GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
     LLM_MODEL_NAME = 'gemini-2.5-pro'
     TEMPERATURE = 0.0
-settings = Settings()
\ No newline at end of file
+    RAW_DATA_DIR = os.getenv('RAW_DATA_DIR', 'data/raw')
+    INGESTION_WORKERS = int(os.getenv('INGESTION_WORKERS', os.cpu_count() or 1))
+    INGESTION_QUEUE_SIZE = int(os.getenv('INGESTION_QUEUE_SIZE', 8))
+    INGESTION_BATCH_SIZE = 256
+    INGESTION_MANIFEST_PATH = os.getenv('INGESTION_MANIFEST_PATH', 'data/ingestion_manifest.json')
+    SOURCE_ROOT = os.getenv('SOURCE_ROOT', os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    EMBEDDING_CACHE_ENABLED = os.getenv('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR', 'data/embedding_cache')
+    EMBEDDING_CACHE_DTYPE = 'float16'
+    QUERY_EMBEDDING_CACHE_SIZE = 2048
+    EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', 64))
+    UPSERT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', 256))
+    UPSERT_PARALLELISM = int(os.getenv('UPSERT_PARALLELISM', 2))
+    UPSERT_WAIT = os.getenv('UPSERT_WAIT', 'false').lower() == 'true'
+    PARENT_STORE = os.getenv('PARENT_STORE', 'docstore')
+    PARENT_STORE_PATH = os.getenv('PARENT_STORE_PATH', 'data/parent_store.sqlite3')
+    ASYNC_EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', 4))
+    MICROBATCH_MAX_SIZE = 32
+    MICROBATCH_MAX_WAIT_MS = 5.0
+    SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true'
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.95))
+    SEMANTIC_CACHE_MAX_ENTRIES = 1000
+    SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv('SEMANTIC_CACHE_TTL_SECONDS', 3600))
+    RETRIEVAL_MODE = os.getenv('RETRIEVAL_MODE', 'standard')
+    PARENT_CANDIDATES_FACTOR = 2
+    PARENT_CACHE_SIZE = int(os.getenv('PARENT_CACHE_SIZE', 512))
+    HYBRID_SEARCH = os.getenv('HYBRID_SEARCH', 'false').lower() == 'true'
+    DENSE_VECTOR_NAME = 'dense'
+    SPARSE_VECTOR_NAME = 'sparse'
+    BM25_AVG_DOC_LEN = 60.0
+    FETCH_K_FACTOR = 4
+    HYBRID_FETCH_K_FACTOR = 2
+    HYBRID_PREFETCH_FACTOR = 4
+    COLLECTION_PROFILE = os.getenv('COLLECTION_PROFILE', 'default')
+    COLLECTION_PROFILES = {'default': {'quantization': None, 'on_disk': False, 'on_disk_payload': False, 'hnsw_m': 16, 'ef_construct': 100}, 'int8': {'quantization': 'int8', 'on_disk': True, 'on_disk_payload': True, 'hnsw_m': 16, 'ef_construct': 100, 'oversampling': 2.0}, 'binary': {'quantization': 'binary', 'on_disk': True, 'on_disk_payload': True, 'hnsw_m': 16, 'ef_construct': 100, 'oversampling': 4.0}, 'disk': {'quantization': None, 'on_disk': True, 'on_disk_payload': True, 'hnsw_m': 16, 'ef_construct': 100}}
+    QUANTIZATION_RESCORE = True
+    INDEXING_THRESHOLD = int(os.getenv('INDEXING_THRESHOLD', 20000))
+    PAYLOAD_INDEX_FIELDS = {'type': 'keyword', 'parent_id': 'keyword', 'source': 'keyword', 'page': 'integer', 'tenant': 'keyword', **dict((item.split(':', 1) for item in os.getenv('PAYLOAD_INDEX_EXTRA', '').split(',') if item))}
+    TENANT_FIELD = 'tenant'
+    TENANT_ROUTING = os.getenv('TENANT_ROUTING', 'payload')
+    TENANT_FANOUT_WORKERS = int(os.getenv('TENANT_FANOUT_WORKERS', 4))
+    SEARCH_BATCH_SIZE = int(os.getenv('SEARCH_BATCH_SIZE', 64))
+    RERANKER_MODEL = os.getenv('RERANKER_MODEL', 'ms-marco-MiniLM-L-12-v2')
+    RERANKER_MODEL_COSTS_MS = {'ms-marco-MiniLM-L-12-v2': 12.0, 'ms-marco-TinyBERT-L-2-v2': 1.5}
+    RERANK_LATENCY_BUDGET_MS = float(os.getenv('RERANK_LATENCY_BUDGET_MS', 0))
+    RERANK_EXPECTED_CANDIDATES = 20
+    RERANK_MAX_LENGTH = int(os.getenv('RERANK_MAX_LENGTH', 512))
+    RERANK_CHARS_PER_TOKEN = 4
+    RERANK_CACHE_SIZE = int(os.getenv('RERANK_CACHE_SIZE', 4096))
+    RERANK_PRUNE_MARGIN = float(os.getenv('RERANK_PRUNE_MARGIN', 0.15))
+    RERANK_MAX_BATCH_PAIRS = 64
+    QDRANT_POOL_SIZE = int(os.getenv('QDRANT_POOL_SIZE', 32))
+    WARMUP_COMPONENTS = ['qdrant_client', 'embeddings', 'reranker']
+    PAGE_CACHE_ENABLED = os.getenv('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+    PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', 'data/page_cache.sqlite3')
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 1))
+    PDF_PARALLEL_MIN_PAGES = 64
+    PDF_PAGE_RANGE_SIZE = 32
+    MIN_PAGE_CHARS = 50
+    INGESTION_PAGE_BATCH = 32
+    CLEANER_PRESERVE_PARAGRAPHS = os.getenv('CLEANER_PRESERVE_PARAGRAPHS', 'true').lower() == 'true'
+    SPLITTER_PARENT_TOKENS = int(os.getenv('SPLITTER_PARENT_TOKENS', 448))
+    SPLITTER_CHILD_TOKENS = int(os.getenv('SPLITTER_CHILD_TOKENS', 128))
+    SPLITTER_PARENT_OVERLAP = 48
+    SPLITTER_CHILD_OVERLAP = 16
+    EMBEDDING_MAX_TOKENS = 256
+    REWRITE_MODE = os.getenv('REWRITE_MODE', 'heuristic')
+    REWRITE_MODEL_NAME = os.getenv('REWRITE_MODEL_NAME', 'gemini-2.5-flash-lite')
+    REWRITE_MIN_CONTENT_WORDS = 3
+    REWRITE_MATERIAL_OVERLAP = 0.6
+    CONTEXT_PACKING = os.getenv('CONTEXT_PACKING', 'true').lower() == 'true'
+    CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', 1500))
+    CONTEXT_ENCODING = 'cl100k_base'
+    CONTEXT_CHARS_PER_TOKEN = 4
+    CONTEXT_DEDUP_THRESHOLD = 0.8
+    TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+    TELEMETRY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+    TELEMETRY_SAMPLE_SIZE = 2048
+    TELEMETRY_MAX_SPANS = 512
+    TELEMETRY_EXPORT_PATH = os.getenv('TELEMETRY_EXPORT_PATH')
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+settings = Settings()
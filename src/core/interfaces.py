@@ -12,4 +12,7 @@ class BaseCleaner(ABC):
 
     @abstractmethod
     def clean(self, text: str) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    def clean_batch(self, texts: List[str]) -> List[str]:
+        return [self.clean(t) for t in texts]
\ No newline at end of file
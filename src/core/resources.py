@@ -0,0 +1,94 @@
+import time
+import importlib
+import threading
+from typing import Callable, Dict, Iterable
+from core.config import settings
+from core.telemetry import get_echo
+echo = get_echo(__name__)
+
+class ResourceRegistry:
+
+    def __init__(self):
+        self._resources: Dict[str, object] = {}
+        self._lock = threading.RLock()
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def _get(self, name: str, modules: Iterable[str], build: Callable[[], object]):
+        resource = self._resources.get(name)
+        if resource is not None:
+            return resource
+        with self._lock:
+            if name not in self._resources:
+                start = time.perf_counter()
+                for module in modules:
+                    importlib.import_module(module)
+                imported = time.perf_counter()
+                self._resources[name] = build()
+                self.timings[name] = {'import': imported - start, 'init': time.perf_counter() - imported, 'warmup': 0.0}
+            return self._resources[name]
+
+    def embeddings(self):
+
+        def build():
+            from vector_store.embedding_cache import build_embeddings
+            echo(f'🧠 Cargando modelo de embeddings: {settings.EMBEDDING_MODEL_NAME}...')
+            return build_embeddings()
+        return self._get('embeddings', ['langchain_huggingface'], build)
+
+    def reranker(self):
+
+        def build():
+            from retrieval.reranking import RerankerService
+            return RerankerService()
+        return self._get('reranker', ['flashrank'], build)
+
+    def qdrant_client(self, url: str=None):
+        url = url or settings.QDRANT_URL
+
+        def build():
+            from qdrant_client import QdrantClient
+            return QdrantClient(url=url, pool_size=settings.QDRANT_POOL_SIZE)
+        return self._get(f'qdrant:{url}', ['qdrant_client'], build)
+
+    def parent_store(self, path: str=None):
+        path = path or settings.PARENT_STORE_PATH
+
+        def build():
+            from vector_store.docstore import ParentDocStore
+            return ParentDocStore(path)
+        return self._get(f'parent_store:{path}', [], build)
+
+    def llm(self, model_name: str=None):
+        model_name = model_name or settings.LLM_MODEL_NAME
+
+        def build():
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            if not settings.GOOGLE_API_KEY:
+                raise ValueError('⚠️ GOOGLE_API_KEY falta en .env')
+            return ChatGoogleGenerativeAI(model=model_name, temperature=settings.TEMPERATURE, google_api_key=settings.GOOGLE_API_KEY)
+        return self._get(f'llm:{model_name}', ['langchain_google_genai'], build)
+
+    def warmup(self, components: Iterable[str]=None):
+        components = list(components or settings.WARMUP_COMPONENTS)
+        echo(f"🔥 Precalentando recursos: {', '.join(components)}...")
+        for component in components:
+            try:
+                resource = getattr(self, component)()
+                start = time.perf_counter()
+                if component == 'embeddings':
+                    getattr(resource, 'embeddings', resource).embed_documents(['warmup'])
+                elif component == 'reranker':
+                    resource.warmup()
+                elif component == 'qdrant_client':
+                    resource.get_collections()
+                name = next((n for n, r in self._resources.items() if r is resource))
+                self.timings[name]['warmup'] = time.perf_counter() - start
+            except Exception as e:
+                echo(f"⚠️ No se pudo precalentar '{component}': {e}")
+        self.report()
+
+    def report(self):
+        echo('\n--- ⏱️ Arranque por componente (s) ---')
+        for name, timing in self.timings.items():
+            echo(f"{name:<40} import={timing['import']:>6.2f} | init={timing['init']:>6.2f} | warmup={timing['warmup']:>6.2f}")
+registry = ResourceRegistry()
@@ -0,0 +1,158 @@
+import re
+import sys
+import json
+import time
+import bisect
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Tuple
+import numpy as np
+from core.config import settings
+_current_span: ContextVar[str] = ContextVar('medirag_span', default=None)
+_METRIC_NAME_RE = re.compile('[^a-zA-Z0-9_]')
+_LEVELS = (('❌', logging.ERROR), ('🛑', logging.ERROR), ('⚠️', logging.WARNING))
+
+def _metric_name(name: str) -> str:
+    return _METRIC_NAME_RE.sub('_', name)
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Telemetry:
+
+    def __init__(self, enabled: bool=None, buckets: Tuple[float, ...]=None, sample_size: int=None, max_spans: int=None):
+        self.enabled = settings.TELEMETRY_ENABLED if enabled is None else enabled
+        self.buckets = tuple(buckets or settings.TELEMETRY_BUCKETS)
+        self.sample_size = sample_size or settings.TELEMETRY_SAMPLE_SIZE
+        self._lock = threading.Lock()
+        self._stages: Dict[str, dict] = {}
+        self.counters: Dict[str, float] = {}
+        self.spans = deque(maxlen=max_spans or settings.TELEMETRY_MAX_SPANS)
+
+    def _stage(self, name: str) -> dict:
+        stage = self._stages.get(name)
+        if stage is None:
+            stage = self._stages[name] = {'count': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(self.buckets) + 1), 'samples': deque(maxlen=self.sample_size)}
+        return stage
+
+    def observe(self, name: str, seconds: float, parent: str=None, **attrs):
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self._stage(name)
+            stage['count'] += 1
+            stage['sum'] += seconds
+            stage['max'] = max(stage['max'], seconds)
+            stage['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            stage['samples'].append(seconds)
+            self.spans.append({'name': name, 'parent': parent, 'end': time.time(), 'seconds': seconds, **attrs})
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            yield attrs
+            return
+        parent = _current_span.get()
+        token = _current_span.set(name)
+        start = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            _current_span.reset(token)
+            self.observe(name, time.perf_counter() - start, parent=parent, **attrs)
+
+    def incr(self, name: str, value: float=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self.counters.clear()
+            self.spans.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {}
+            for name, stage in self._stages.items():
+                samples = np.asarray(stage['samples'])
+                stages[name] = {'count': stage['count'], 'total_seconds': stage['sum'], 'mean_seconds': stage['sum'] / stage['count'], 'p50_seconds': float(np.percentile(samples, 50)), 'p95_seconds': float(np.percentile(samples, 95)), 'max_seconds': stage['max']}
+            return {'stages': stages, 'counters': dict(self.counters), 'recent_spans': list(self.spans)}
+
+    def export_json(self, indent: int=2) -> str:
+        return json.dumps(self.snapshot(), indent=indent, ensure_ascii=False)
+
+    def export_prometheus(self, prefix: str='medirag') -> str:
+        lines = [f'# HELP {prefix}_stage_seconds Duración de cada etapa del pipeline RAG.', f'# TYPE {prefix}_stage_seconds histogram']
+        with self._lock:
+            for name, stage in sorted(self._stages.items()):
+                label = f'stage="{_escape_label(name)}"'
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), stage['buckets']):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{prefix}_stage_seconds_bucket{{{label},le="{le}"}} {cumulative}')
+                lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {stage['sum']}")
+                lines.append(f"{prefix}_stage_seconds_count{{{label}}} {stage['count']}")
+            for name, value in sorted(self.counters.items()):
+                metric = f'{prefix}_{_metric_name(name)}_total'
+                lines.extend([f'# TYPE {metric} counter', f'{metric} {value}'])
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str):
+        content = self.export_prometheus() if path.endswith(('.prom', '.txt')) else self.export_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        echo(f'📈 Telemetría exportada a {path}')
+
+    def flush(self, path: str=None):
+        path = path or settings.TELEMETRY_EXPORT_PATH
+        if path:
+            self.write(path)
+
+    def report(self):
+        snapshot = self.snapshot()
+        echo('\n--- ⏱️ Latencia por etapa ---')
+        for name, stage in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['total_seconds']):
+            echo(f"{name:<24} n={stage['count']:>6} | total={stage['total_seconds']:>8.3f} s | p50={stage['p50_seconds'] * 1000:>8.2f} ms | p95={stage['p95_seconds'] * 1000:>8.2f} ms")
+        for name, value in sorted(snapshot['counters'].items()):
+            echo(f'{name:<24} {value:>10.0f}')
+
+class JsonLogFormatter(logging.Formatter):
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {'ts': round(record.created, 6), 'level': record.levelname.lower(), 'logger': record.name, 'msg': record.getMessage()}
+        payload.update(getattr(record, 'fields', {}))
+        return json.dumps(payload, ensure_ascii=False)
+
+def configure_logging(log_format: str=None):
+    log_format = log_format or settings.LOG_FORMAT
+    if log_format != 'json':
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonLogFormatter())
+    root = logging.getLogger('medirag')
+    root.handlers[:] = [handler]
+    root.setLevel(logging.INFO)
+    root.propagate = False
+
+def get_echo(name: str):
+    logger = logging.getLogger(f'medirag.{name}')
+
+    def echo(*args, sep: str=' ', end: str='\n', file=None, flush: bool=False):
+        if settings.LOG_FORMAT != 'json' or file is not None:
+            print(*args, sep=sep, end=end, file=file, flush=flush)
+            return
+        message = sep.join((str(a) for a in args)).strip()
+        if not message:
+            return
+        level = next((lvl for marker, lvl in _LEVELS if marker in message[:4]), logging.INFO)
+        logger.log(level, message, extra={'fields': {'span': _current_span.get()}})
+    return echo
+echo = get_echo(__name__)
+telemetry = Telemetry()
@@ -0,0 +1,113 @@
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import get_echo
+echo = get_echo(__name__)
+_SENTENCE_RE = re.compile('(?<=[.!?])\\s+')
+_WORD_RE = re.compile('\\w+', re.UNICODE)
+
+@lru_cache(maxsize=None)
+def load_token_counter(encoding_name: str=None) -> Callable[[str], int]:
+    encoding_name = encoding_name or settings.CONTEXT_ENCODING
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding(encoding_name)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception as e:
+        echo(f'⚠️ Codificación tiktoken {encoding_name} no disponible ({type(e).__name__}); se estiman {settings.CONTEXT_CHARS_PER_TOKEN} caracteres por token.')
+        return lambda text: -(-len(text) // settings.CONTEXT_CHARS_PER_TOKEN)
+
+def doc_score(doc: Document) -> float:
+    return doc.metadata.get('rerank_score', doc.metadata.get('retrieval_score', 0.0))
+
+def _overlap_merge(first: str, second: str, min_overlap: int=32) -> str:
+    anchor = first.find(second[:min_overlap]) if len(second) >= min_overlap else -1
+    while anchor != -1:
+        if second.startswith(first[anchor:]):
+            return first + second[len(first) - anchor:]
+        anchor = first.find(second[:min_overlap], anchor + 1)
+    return None
+
+def merge_adjacent(docs: List[Document]) -> List[Document]:
+    groups: Dict[Tuple[str, str], List[Document]] = {}
+    for doc in docs:
+        groups.setdefault((doc.metadata.get('source'), doc.metadata.get('page')), []).append(doc)
+    merged = []
+    for group in groups.values():
+        group.sort(key=lambda d: d.metadata.get('page_span', [0])[0])
+        current = group[0]
+        for doc in group[1:]:
+            span, next_span = (current.metadata.get('page_span'), doc.metadata.get('page_span'))
+            if span and next_span:
+                text = current.page_content + doc.page_content[span[1] - next_span[0]:] if next_span[0] <= span[1] else None
+            else:
+                text = _overlap_merge(current.page_content, doc.page_content) or _overlap_merge(doc.page_content, current.page_content)
+            if text is None:
+                merged.append(current)
+                current = doc
+                continue
+            metadata = {**current.metadata, 'merged_ids': current.metadata.get('merged_ids', [current.metadata.get('doc_id')]) + [doc.metadata.get('doc_id')]}
+            metadata['rerank_score'] = max(doc_score(current), doc_score(doc))
+            if span and next_span:
+                metadata['page_span'] = [span[0], max(span[1], next_span[1])]
+            current = Document(page_content=text, metadata=metadata)
+        merged.append(current)
+    return sorted(merged, key=doc_score, reverse=True)
+
+def _header(doc: Document) -> str:
+    return f"[Fuente: {doc.metadata.get('source')} (Pág {doc.metadata.get('page')})]: "
+
+def _sentence_words(sentence: str) -> frozenset:
+    return frozenset(_WORD_RE.findall(sentence.lower()))
+
+def _numbers(words: frozenset) -> frozenset:
+    return frozenset((w for w in words if any((c.isdigit() for c in w))))
+
+class ContextPacker:
+
+    def __init__(self, token_budget: int=None, dedup_threshold: float=None, counter: Callable[[str], int]=None):
+        self.token_budget = token_budget or settings.CONTEXT_TOKEN_BUDGET
+        self.dedup_threshold = settings.CONTEXT_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+        self.count_tokens = counter if counter else load_token_counter()
+
+    def _is_duplicate(self, words: frozenset, seen: Dict[str, List[frozenset]]) -> bool:
+        if not words - _numbers(words):
+            return False
+        candidates = {id(s): s for w in words for s in seen.get(w, [])}
+        return any((len(words & s) / len(words | s) >= self.dedup_threshold and _numbers(words) == _numbers(s) for s in candidates.values()))
+
+    def pack(self, docs: List[Document]) -> dict:
+        input_tokens = sum((self.count_tokens(f"{_header(d)}{' '.join(d.page_content.split())}") + 1 for d in docs))
+        merged = merge_adjacent(docs)
+        seen: Dict[str, List[frozenset]] = {}
+        sections = []
+        used = 0
+        dropped = 0
+        for doc in merged:
+            header = _header(doc)
+            budget = self.token_budget - used - self.count_tokens(header)
+            kept = []
+            for sentence in _SENTENCE_RE.split(doc.page_content):
+                sentence = ' '.join(sentence.split())
+                words = _sentence_words(sentence)
+                if not words:
+                    continue
+                if self._is_duplicate(words, seen):
+                    dropped += 1
+                    continue
+                tokens = self.count_tokens(sentence) + 1
+                if tokens > budget:
+                    break
+                budget -= tokens
+                kept.append(sentence)
+                for w in words:
+                    seen.setdefault(w, []).append(words)
+            if kept:
+                section = header + ' '.join(kept)
+                sections.append((section, doc))
+                used += self.count_tokens(section) + 1
+            if budget <= 0 or used >= self.token_budget:
+                break
+        return {'context': '\n\n'.join((s for s, _ in sections)), 'docs': [d for _, d in sections], 'context_tokens': used, 'input_tokens': input_tokens, 'merged': len(docs) - len(merged), 'dropped_sentences': dropped}
@@ -0,0 +1,26 @@
+import re
+from typing import Set
+from core.config import settings
+_WORD_RE = re.compile('\\w+', re.UNICODE)
+_CLITIC_RE = re.compile('\\w{3,}(?:ar|er|ir|ndo)(?:lo|la|los|las|le|les)$', re.UNICODE)
+STOPWORDS = frozenset('a al algo como con cual cuales cuando de del el en es están fue ha hay la las los me mi muy no o para pero por que qué quien se sin sobre son su sus te tiene un una uno unos y ya cómo cuál cuáles cuándo dónde the a an of and or to in on for with is are was what which how when who does do can'.split())
+ANAPHORA = frozenset('eso esto esta este ese esa esos esas estos estas ello él ella ellos ellas dicho dicha dichos dichas mismo misma anterior anteriores previo previa aquel aquella ahí allí también además otro otra otros otras it its this that these those they them their same above previous also'.split())
+CONTINUATION_STARTS = frozenset('y e pero entonces pues o u and but so then'.split())
+
+def content_words(text: str) -> Set[str]:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS and w not in ANAPHORA}
+
+def is_self_contained(query: str, min_content_words: int=None) -> bool:
+    words = _WORD_RE.findall(query.lower())
+    if not words or words[0] in CONTINUATION_STARTS:
+        return False
+    if any((w in ANAPHORA or _CLITIC_RE.match(w) for w in words)):
+        return False
+    min_content_words = settings.REWRITE_MIN_CONTENT_WORDS if min_content_words is None else min_content_words
+    return len([w for w in words if w not in STOPWORDS]) >= min_content_words
+
+def query_overlap(a: str, b: str) -> float:
+    words_a, words_b = (content_words(a), content_words(b))
+    if not words_a and (not words_b):
+        return 1.0
+    return len(words_a & words_b) / len(words_a | words_b)
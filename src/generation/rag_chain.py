@@ -1,51 +1,312 @@
-from typing import List, Tuple
-from langchain_google_genai import ChatGoogleGenerativeAI
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Iterator, List, Tuple
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.language_models import BaseChatModel
 from core.config import settings
+from core.telemetry import get_echo, telemetry
+from core.resources import registry
 from retrieval.services import MedicalRetriever, VectorDBConnectionError
+from generation.semantic_cache import SemanticAnswerCache
+from generation.context_packing import ContextPacker, load_token_counter
+from generation.query_rewrite import is_self_contained, query_overlap
+echo = get_echo(__name__)
+DB_ERROR_MESSAGE = '⚠️ Error: No puedo acceder a mi memoria médica en este momento. Por favor verifica que el servicio de Qdrant esté activo.'
+NO_DOCS_MESSAGE = 'No encontré información relevante.'
+_NOT_RETRIEVED = object()
 
 class MedicalChatBot:
 
-    def __init__(self, retriever_service: MedicalRetriever):
+    def __init__(self, retriever_service: MedicalRetriever, llm: BaseChatModel=None, semantic_cache: SemanticAnswerCache=None, rewrite_llm: BaseChatModel=None, rewrite_mode: str=None, context_packer: ContextPacker=None):
         self.retriever_service = retriever_service
-        if not settings.GOOGLE_API_KEY:
-            raise ValueError('⚠️ GOOGLE_API_KEY falta en .env')
-        self.llm = ChatGoogleGenerativeAI(model=settings.LLM_MODEL_NAME, temperature=settings.TEMPERATURE, google_api_key=settings.GOOGLE_API_KEY)
+        if semantic_cache is None and settings.SEMANTIC_CACHE_ENABLED:
+            semantic_cache = SemanticAnswerCache()
+        self.semantic_cache = semantic_cache
+        if context_packer is None and settings.CONTEXT_PACKING:
+            context_packer = ContextPacker()
+        self.context_packer = context_packer
+        self.count_tokens = context_packer.count_tokens if context_packer else load_token_counter()
+        self.llm = llm if llm else registry.llm()
+        self.rewrite_llm = rewrite_llm if rewrite_llm else llm if llm else registry.llm(settings.REWRITE_MODEL_NAME)
+        self.rewrite_mode = rewrite_mode or settings.REWRITE_MODE
+        self.rewrite_stats = {'turns': 0, 'skipped': 0, 'rewritten': 0, 'speculative_hits': 0, 'cache_hits': 0, 're_retrievals': 0, 'saved_seconds': 0.0}
+        self._rewrite_ema = None
+        self._speculation_executor = None
         self.contextualize_q_system_prompt = 'Dada una historia de chat y la última pregunta del usuario \n        (que podría hacer referencia al contexto anterior), formula una pregunta independiente \n        que pueda entenderse sin el historial. NO respondas la pregunta, solo reformúlala si es necesario \n        o devuélvela tal cual si ya es explicita.'
         self.contextualize_q_prompt = ChatPromptTemplate.from_messages([('system', self.contextualize_q_system_prompt), MessagesPlaceholder(variable_name='chat_history'), ('human', '{question}')])
-        self.history_chain = self.contextualize_q_prompt | self.llm | StrOutputParser()
+        self.history_chain = self.contextualize_q_prompt | self.rewrite_llm | StrOutputParser()
         self.qa_system_prompt = 'Eres un asistente médico experto. Usa los siguientes fragmentos de contexto recuperado para responder la pregunta.\n        Si no sabes la respuesta, di que no lo sabes. Usa un máximo de tres oraciones y sé conciso.\n        \n        Contexto:\n        {context}\n        '
         self.qa_prompt = ChatPromptTemplate.from_messages([('system', self.qa_system_prompt), MessagesPlaceholder(variable_name='chat_history'), ('human', '{question}')])
+        self.qa_chain = self.qa_prompt | self.llm | StrOutputParser()
+
+    @property
+    def speculation_executor(self) -> ThreadPoolExecutor:
+        if self._speculation_executor is None:
+            self._speculation_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='speculation')
+        return self._speculation_executor
+
+    def close(self):
+        if self._speculation_executor is not None:
+            self._speculation_executor.shutdown(wait=False, cancel_futures=True)
+            self._speculation_executor = None
 
     def _format_docs(self, docs) -> str:
         formatted = []
         for i, doc in enumerate(docs):
             content = doc.page_content.replace('\n', ' ')
             meta = doc.metadata
-            formatted.append(f'[Fuente: {meta.get('source')} (Pág {meta.get('page')})]: {content}')
+            formatted.append(f"[Fuente: {meta.get('source')} (Pág {meta.get('page')})]: {content}")
         return '\n\n'.join(formatted)
 
-    def answer(self, query: str, chat_history: List[Tuple[str, str]]=[]):
+    def _to_lc_history(self, chat_history: List[Tuple[str, str]]):
         lc_history = []
         for human, ai in chat_history:
             lc_history.append(HumanMessage(content=human))
             lc_history.append(AIMessage(content=ai))
-        print(f'🤔 Pregunta original: {query}')
-        if lc_history:
-            refined_query = self.history_chain.invoke({'chat_history': lc_history, 'question': query})
-            print(f'🔄 Pregunta reescrita (contextualizada): {refined_query}')
+        return lc_history
+
+    def _qa_inputs(self, lc_history, relevant_docs, question: str) -> Tuple[dict, dict]:
+        if self.context_packer is not None:
+            with telemetry.span('context.pack', docs=len(relevant_docs)):
+                packed = self.context_packer.pack(relevant_docs)
+            context_str = packed['context']
+            usage = {'context_tokens': packed['context_tokens'], 'input_context_tokens': packed['input_tokens'], 'merged_parents': packed['merged'], 'dropped_sentences': packed['dropped_sentences']}
         else:
-            refined_query = query
+            context_str = self._format_docs(relevant_docs)
+            usage = {'context_tokens': self.count_tokens(context_str)}
+            usage['input_context_tokens'] = usage['context_tokens']
+        inputs = {'chat_history': lc_history, 'context': context_str, 'question': question}
+        usage['prompt_tokens'] = sum((self.count_tokens(m.content) for m in self.qa_prompt.format_messages(**inputs)))
+        telemetry.incr('prompt_tokens', usage['prompt_tokens'])
+        telemetry.incr('context_tokens', usage['context_tokens'])
+        return (inputs, usage)
+
+    def _done_event(self, start: float, first_token: float, response: str, relevant_docs, rewrite: dict, usage: dict=None) -> Tuple[str, dict]:
+        ttft = (first_token or time.perf_counter()) - start
+        total = time.perf_counter() - start
+        telemetry.observe('chat.ttft', ttft)
+        telemetry.observe('chat.answer', total, plan=rewrite.get('plan'), sources=len(relevant_docs))
+        return ('done', {'response': response, 'sources': relevant_docs, 'ttft_seconds': ttft, 'total_seconds': total, 'rewrite': rewrite, 'usage': usage or {}})
+
+    def _rewrite_plan(self, query: str, lc_history) -> str:
+        if not lc_history:
+            return 'none'
+        if self.rewrite_mode != 'always' and is_self_contained(query):
+            return 'skip'
+        return 'speculative' if self.rewrite_mode == 'speculative' else 'rewrite'
+
+    def _skip_rewrite(self, query: str, rewrite: dict) -> Tuple[str, object]:
+        rewrite['saved_seconds'] = self._rewrite_ema or 0.0
+        self.rewrite_stats['skipped'] += 1
+        self.rewrite_stats['saved_seconds'] += rewrite['saved_seconds']
+        echo(f"⚡ Pregunta autocontenida: se omite la reescritura (ahorro estimado {rewrite['saved_seconds'] * 1000:.0f} ms).")
+        return (query, _NOT_RETRIEVED, None)
+
+    def _record_rewrite(self, refined_query: str, seconds: float, rewrite: dict):
+        rewrite['rewrite_seconds'] = seconds
+        self._rewrite_ema = seconds if self._rewrite_ema is None else 0.8 * self._rewrite_ema + 0.2 * seconds
+        self.rewrite_stats['rewritten'] += 1
+        echo(f'🔄 Pregunta reescrita (contextualizada): {refined_query}')
+
+    def _speculation_hit(self, probe) -> bool:
+        if probe is None or probe[1] is None:
+            return False
+        self.rewrite_stats['cache_hits'] += 1
+        echo('⚡ La pregunta reescrita está en la caché semántica: se descarta la recuperación especulativa.')
+        return True
+
+    def _resolve_speculation(self, query: str, refined_query: str, speculative_docs, retrieval_seconds: float, rewrite_seconds: float, probe, rewrite: dict) -> Tuple[str, object, object]:
+        if query_overlap(query, refined_query) < settings.REWRITE_MATERIAL_OVERLAP:
+            self.rewrite_stats['re_retrievals'] += 1
+            echo('🔁 La reescritura cambia la pregunta: se repite la recuperación.')
+            return (refined_query, _NOT_RETRIEVED, probe)
+        rewrite['saved_seconds'] = min(rewrite_seconds, retrieval_seconds)
+        self.rewrite_stats['speculative_hits'] += 1
+        self.rewrite_stats['saved_seconds'] += rewrite['saved_seconds']
+        echo(f"🔀 Recuperación especulativa reutilizada (ahorro {rewrite['saved_seconds'] * 1000:.0f} ms).")
+        return (refined_query, speculative_docs, probe)
+
+    def _timed_rewrite(self, query: str, lc_history) -> Tuple[str, float]:
+        start = time.perf_counter()
+        refined_query = self.history_chain.invoke({'chat_history': lc_history, 'question': query})
+        seconds = time.perf_counter() - start
+        telemetry.observe('llm.rewrite', seconds)
+        return (refined_query, seconds)
+
+    async def _atimed_rewrite(self, query: str, lc_history) -> Tuple[str, float]:
+        start = time.perf_counter()
+        refined_query = await self.history_chain.ainvoke({'chat_history': lc_history, 'question': query})
+        seconds = time.perf_counter() - start
+        telemetry.observe('llm.rewrite', seconds)
+        return (refined_query, seconds)
+
+    def _retrieve(self, query: str):
         try:
-            relevant_docs = self.retriever_service.search(refined_query, k=4)
+            return self.retriever_service.search(query, k=4)
         except VectorDBConnectionError as e:
-            print(f'⚠️ Fallo en recuperación: {e}')
-            return ('⚠️ Error: No puedo acceder a mi memoria médica en este momento. Por favor verifica que el servicio de Qdrant esté activo.', [])
+            echo(f'⚠️ Fallo en recuperación: {e}')
+            return None
+
+    async def _aretrieve(self, query: str):
+        try:
+            return await self.retriever_service.asearch(query, k=4)
+        except VectorDBConnectionError as e:
+            echo(f'⚠️ Fallo en recuperación: {e}')
+            return None
+
+    def _timed_retrieve(self, query: str) -> Tuple[object, float]:
+        start = time.perf_counter()
+        docs = self._retrieve(query)
+        return (docs, time.perf_counter() - start)
+
+    async def _atimed_retrieve(self, query: str) -> Tuple[object, float]:
+        start = time.perf_counter()
+        docs = await self._aretrieve(query)
+        return (docs, time.perf_counter() - start)
+
+    def _probe_cache(self, query: str) -> Tuple[List[float], object]:
+        query_vector = self.retriever_service.embed_queries([query])[0]
+        return (query_vector, self.semantic_cache.lookup(query, query_vector))
+
+    async def _aprobe_cache(self, query: str) -> Tuple[List[float], object]:
+        query_vector = await self.retriever_service.embed_batcher.submit(query)
+        return (query_vector, self.semantic_cache.lookup(query, query_vector))
+
+    def _contextualize(self, query: str, lc_history, rewrite: dict) -> Tuple[str, object, object]:
+        plan = rewrite['plan'] = self._rewrite_plan(query, lc_history)
+        if plan == 'none':
+            return (query, _NOT_RETRIEVED, None)
+        self.rewrite_stats['turns'] += 1
+        if plan == 'skip':
+            return self._skip_rewrite(query, rewrite)
+        if plan == 'rewrite':
+            refined_query, seconds = self._timed_rewrite(query, lc_history)
+            self._record_rewrite(refined_query, seconds, rewrite)
+            return (refined_query, _NOT_RETRIEVED, None)
+        future = self.speculation_executor.submit(self._timed_retrieve, query)
+        refined_query, rewrite_seconds = self._timed_rewrite(query, lc_history)
+        self._record_rewrite(refined_query, rewrite_seconds, rewrite)
+        probe = self._probe_cache(refined_query) if self.semantic_cache is not None else None
+        if self._speculation_hit(probe):
+            return (refined_query, _NOT_RETRIEVED, probe)
+        speculative_docs, retrieval_seconds = future.result()
+        return self._resolve_speculation(query, refined_query, speculative_docs, retrieval_seconds, rewrite_seconds, probe, rewrite)
+
+    async def _acontextualize(self, query: str, lc_history, rewrite: dict) -> Tuple[str, object, object]:
+        plan = rewrite['plan'] = self._rewrite_plan(query, lc_history)
+        if plan == 'none':
+            return (query, _NOT_RETRIEVED, None)
+        self.rewrite_stats['turns'] += 1
+        if plan == 'skip':
+            return self._skip_rewrite(query, rewrite)
+        if plan == 'rewrite':
+            refined_query, seconds = await self._atimed_rewrite(query, lc_history)
+            self._record_rewrite(refined_query, seconds, rewrite)
+            return (refined_query, _NOT_RETRIEVED, None)
+        retrieval_task = asyncio.create_task(self._atimed_retrieve(query))
+        try:
+            refined_query, rewrite_seconds = await self._atimed_rewrite(query, lc_history)
+            self._record_rewrite(refined_query, rewrite_seconds, rewrite)
+            probe = await self._aprobe_cache(refined_query) if self.semantic_cache is not None else None
+            if self._speculation_hit(probe):
+                return (refined_query, _NOT_RETRIEVED, probe)
+            speculative_docs, retrieval_seconds = await retrieval_task
+        finally:
+            retrieval_task.cancel()
+            await asyncio.gather(retrieval_task, return_exceptions=True)
+        return self._resolve_speculation(query, refined_query, speculative_docs, retrieval_seconds, rewrite_seconds, probe, rewrite)
+
+    def stream_answer(self, query: str, chat_history: List[Tuple[str, str]]=[]) -> Iterator[Tuple[str, Any]]:
+        start = time.perf_counter()
+        lc_history = self._to_lc_history(chat_history)
+        echo(f'🤔 Pregunta original: {query}')
+        rewrite = {'mode': self.rewrite_mode, 'rewrite_seconds': 0.0, 'saved_seconds': 0.0}
+        refined_query, relevant_docs, probe = self._contextualize(query, lc_history, rewrite)
+        if self.semantic_cache is not None:
+            query_vector, cached = probe or self._probe_cache(refined_query)
+            if cached is not None:
+                echo('⚡ Respuesta servida desde la caché semántica.')
+                yield ('sources', cached[1])
+                yield ('token', cached[0])
+                yield self._done_event(start, None, *cached, rewrite)
+                return
+        retrieval_start = start if relevant_docs is not _NOT_RETRIEVED else time.perf_counter()
+        if relevant_docs is _NOT_RETRIEVED:
+            relevant_docs = self._retrieve(refined_query)
+        if not relevant_docs:
+            message = NO_DOCS_MESSAGE if relevant_docs is not None else DB_ERROR_MESSAGE
+            yield ('sources', [])
+            yield ('token', message)
+            yield self._done_event(start, None, message, [], rewrite)
+            return
+        yield ('sources', relevant_docs)
+        parts = []
+        first_token = None
+        inputs, usage = self._qa_inputs(lc_history, relevant_docs, refined_query)
+        echo(f"🧮 Prompt: {usage['prompt_tokens']} tokens (contexto {usage['input_context_tokens']} → {usage['context_tokens']}).")
+        generation_start = time.perf_counter()
+        for token in self.qa_chain.stream(inputs):
+            if first_token is None:
+                first_token = time.perf_counter()
+                echo(f'⏱️ Primer token en {(first_token - start) * 1000:.0f} ms')
+            parts.append(token)
+            yield ('token', token)
+        response = ''.join(parts)
+        telemetry.observe('llm.generate', time.perf_counter() - generation_start, chunks=len(parts))
+        telemetry.incr('completion_chunks', len(parts))
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(refined_query, query_vector, response, relevant_docs, latency_seconds=time.perf_counter() - retrieval_start)
+        yield self._done_event(start, first_token, response, relevant_docs, rewrite, usage)
+
+    async def astream_answer(self, query: str, chat_history: List[Tuple[str, str]]=[]) -> AsyncIterator[Tuple[str, Any]]:
+        start = time.perf_counter()
+        lc_history = self._to_lc_history(chat_history)
+        rewrite = {'mode': self.rewrite_mode, 'rewrite_seconds': 0.0, 'saved_seconds': 0.0}
+        refined_query, relevant_docs, probe = await self._acontextualize(query, lc_history, rewrite)
+        if self.semantic_cache is not None:
+            query_vector, cached = probe or await self._aprobe_cache(refined_query)
+            if cached is not None:
+                yield ('sources', cached[1])
+                yield ('token', cached[0])
+                yield self._done_event(start, None, *cached, rewrite)
+                return
+        retrieval_start = start if relevant_docs is not _NOT_RETRIEVED else time.perf_counter()
+        if relevant_docs is _NOT_RETRIEVED:
+            relevant_docs = await self._aretrieve(refined_query)
         if not relevant_docs:
-            return ('No encontré información relevante.', [])
-        context_str = self._format_docs(relevant_docs)
-        qa_chain = self.qa_prompt | self.llm | StrOutputParser()
-        response = qa_chain.invoke({'chat_history': lc_history, 'context': context_str, 'question': refined_query})
-        return (response, relevant_docs)
\ No newline at end of file
+            message = NO_DOCS_MESSAGE if relevant_docs is not None else DB_ERROR_MESSAGE
+            yield ('sources', [])
+            yield ('token', message)
+            yield self._done_event(start, None, message, [], rewrite)
+            return
+        yield ('sources', relevant_docs)
+        parts = []
+        first_token = None
+        inputs, usage = self._qa_inputs(lc_history, relevant_docs, refined_query)
+        generation_start = time.perf_counter()
+        async for token in self.qa_chain.astream(inputs):
+            if first_token is None:
+                first_token = time.perf_counter()
+            parts.append(token)
+            yield ('token', token)
+        response = ''.join(parts)
+        telemetry.observe('llm.generate', time.perf_counter() - generation_start, chunks=len(parts))
+        telemetry.incr('completion_chunks', len(parts))
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(refined_query, query_vector, response, relevant_docs, latency_seconds=time.perf_counter() - retrieval_start)
+        yield self._done_event(start, first_token, response, relevant_docs, rewrite, usage)
+
+    def answer(self, query: str, chat_history: List[Tuple[str, str]]=[]):
+        for event, payload in self.stream_answer(query, chat_history):
+            if event == 'done':
+                result = (payload['response'], payload['sources'])
+        return result
+
+    async def aanswer(self, query: str, chat_history: List[Tuple[str, str]]=[]):
+        async for event, payload in self.astream_answer(query, chat_history):
+            if event == 'done':
+                result = (payload['response'], payload['sources'])
+        return result
@@ -0,0 +1,110 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from core.config import settings
+from ingestion.manifest import manifest_version
+
+def normalize_query(query: str) -> str:
+    return re.sub('\\s+', ' ', query).strip().lower()
+
+class SemanticAnswerCache:
+
+    def __init__(self, threshold: float=None, max_entries: int=None, ttl_seconds: float=None, dim: int=None, version_fn=manifest_version):
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.max_entries = max_entries or settings.SEMANTIC_CACHE_MAX_ENTRIES
+        self.ttl_seconds = settings.SEMANTIC_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.version_fn = version_fn
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((self.max_entries, dim or settings.VECTOR_SIZE), dtype=np.float32)
+        self._active = np.zeros(self.max_entries, dtype=bool)
+        self._entries: OrderedDict = OrderedDict()
+        self._slot_keys: List[Optional[str]] = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        self._version = self.version_fn()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.seconds_saved = 0.0
+        self._miss_latency_ema = None
+
+    def _check_version(self):
+        version = self.version_fn()
+        if version != self._version:
+            self._clear()
+            self._version = version
+            self.invalidations += 1
+
+    def _clear(self):
+        self._entries.clear()
+        self._active[:] = False
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key)
+        self._active[entry['slot']] = False
+        self._free_slots.append(entry['slot'])
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+            self.invalidations += 1
+
+    def lookup(self, query: str, query_vector: List[float]) -> Optional[Tuple[str, List[Document]]]:
+        now = time.time()
+        key = normalize_query(query)
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is not None and now - entry['created_at'] > self.ttl_seconds:
+                self._evict(key)
+                entry = None
+            if entry is not None:
+                self.exact_hits += 1
+            elif self._entries:
+                vector = np.asarray(query_vector, dtype=np.float32)
+                vector /= np.linalg.norm(vector) or 1.0
+                scores = self._vectors @ vector
+                scores[~self._active] = -1.0
+                slot = int(np.argmax(scores))
+                if scores[slot] >= self.threshold:
+                    match_key = self._slot_keys[slot]
+                    if now - self._entries[match_key]['created_at'] > self.ttl_seconds:
+                        self._evict(match_key)
+                    else:
+                        entry = self._entries[match_key]
+                        key = match_key
+                        self.semantic_hits += 1
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if self._miss_latency_ema is not None:
+                self.seconds_saved += self._miss_latency_ema
+            return (entry['response'], entry['docs'])
+
+    def store(self, query: str, query_vector: List[float], response: str, docs: List[Document], latency_seconds: float=None):
+        key = normalize_query(query)
+        vector = np.asarray(query_vector, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            if latency_seconds is not None:
+                self._miss_latency_ema = latency_seconds if self._miss_latency_ema is None else 0.9 * self._miss_latency_ema + 0.1 * latency_seconds
+            if key in self._entries:
+                self._evict(key)
+            if not self._free_slots:
+                self._evict(next(iter(self._entries)))
+            slot = self._free_slots.pop()
+            self._vectors[slot] = vector
+            self._active[slot] = True
+            self._slot_keys[slot] = key
+            self._entries[key] = {'slot': slot, 'response': response, 'docs': docs, 'created_at': time.time()}
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {'entries': len(self._entries), 'exact_hits': self.exact_hits, 'semantic_hits': self.semantic_hits, 'misses': self.misses, 'hit_rate': hits / total if total else 0.0, 'invalidations': self.invalidations, 'seconds_saved': self.seconds_saved}
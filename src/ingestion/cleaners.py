@@ -1,11 +1,19 @@
 import re
+from core.config import settings
 from core.interfaces import BaseCleaner
+_NOISE_RE = re.compile('\\[\\d+\\]|http\\S+|•')
+_BLANK_LINE_RE = re.compile('\\n[^\\S\\n]*\\n\\s*')
 
 class MedicalTextCleaner(BaseCleaner):
 
+    def __init__(self, preserve_paragraphs: bool=None):
+        self.preserve_paragraphs = settings.CLEANER_PRESERVE_PARAGRAPHS if preserve_paragraphs is None else preserve_paragraphs
+        mode = 'paragraphs' if self.preserve_paragraphs else 'flat'
+        self.cache_key = f'{type(self).__name__}:{mode}'
+
     def clean(self, text: str) -> str:
-        text = re.sub('\\s+', ' ', text).strip()
-        text = re.sub('\\[\\d+\\]', '', text)
-        text = re.sub('http\\S+', '', text)
-        text = text.replace('•', '')
-        return text
\ No newline at end of file
+        text = _NOISE_RE.sub('', text)
+        if not self.preserve_paragraphs:
+            return ' '.join(text.split())
+        paragraphs = ('\n'.join((line for line in (' '.join(raw.split()) for raw in block.splitlines()) if line)) for block in _BLANK_LINE_RE.split(text))
+        return '\n\n'.join((p for p in paragraphs if p))
\ No newline at end of file
@@ -1,32 +1,119 @@
 import os
+import time
 import logging
 import pypdf
-from typing import List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
 from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import get_echo, telemetry
 from core.interfaces import BaseLoader, BaseCleaner
 from ingestion.cleaners import MedicalTextCleaner
+from ingestion.manifest import file_sha256, source_key
+from ingestion.page_cache import PageTextCache
 logger = logging.getLogger(__name__)
+echo = get_echo(__name__)
+
+def _extract_page(page, cleaner: BaseCleaner) -> str:
+    return cleaner.clean(page.extract_text() or '')
+
+def _extract_page_range(source_path: str, start: int, end: int, cleaner: BaseCleaner) -> List[Tuple[int, str, str]]:
+    reader = pypdf.PdfReader(source_path)
+    raw = []
+    errors = {}
+    for i in range(start, end):
+        try:
+            raw.append((i + 1, reader.pages[i].extract_text() or ''))
+        except Exception as e:
+            errors[i + 1] = f'{type(e).__name__}: {e}'
+    cleaned = dict(zip((page for page, _ in raw), cleaner.clean_batch([text for _, text in raw])))
+    return [(page, cleaned.get(page, ''), errors.get(page)) for page in range(start + 1, end + 1)]
 
 class PDFLoader(BaseLoader):
 
-    def __init__(self, cleaner: BaseCleaner=None):
+    def __init__(self, cleaner: BaseCleaner=None, page_cache: PageTextCache=None, workers: int=None):
         self.cleaner = cleaner if cleaner else MedicalTextCleaner()
+        if page_cache is None and settings.PAGE_CACHE_ENABLED:
+            page_cache = PageTextCache()
+        self.page_cache = page_cache
+        self.workers = workers or settings.PDF_WORKERS
+        self.page_counts: Dict[str, int] = {}
+        self.page_errors: Dict[str, List[Tuple[int, str]]] = {}
+
+    def _cache_key(self, source_path: str, fingerprint: dict=None) -> str:
+        stat = os.stat(source_path)
+        if fingerprint and fingerprint.get('sha256') and fingerprint.get('size') == stat.st_size and fingerprint.get('mtime_ns') == stat.st_mtime_ns:
+            digest = fingerprint['sha256']
+        else:
+            digest = file_sha256(source_path)
+        return f"{digest}:{getattr(self.cleaner, 'cache_key', type(self.cleaner).__name__)}"
+
+    def _to_document(self, source_path: str, page: int, text: str) -> Document:
+        return Document(page_content=text, metadata={'source': source_key(source_path), 'page': page, 'cleaned': True, 'char_count': len(text)})
+
+    def _iter_pages(self, source_path: str, reader: pypdf.PdfReader) -> Iterator[Tuple[int, str, str]]:
+        num_pages = len(reader.pages)
+        if self.workers > 1 and num_pages >= settings.PDF_PARALLEL_MIN_PAGES:
+            size = settings.PDF_PAGE_RANGE_SIZE
+            ranges = [(start, min(start + size, num_pages)) for start in range(0, num_pages, size)]
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(ranges))) as pool:
+                futures = [pool.submit(_extract_page_range, source_path, start, end, self.cleaner) for start, end in ranges]
+                for future in futures:
+                    yield from future.result()
+            return
+        for i, page in enumerate(reader.pages):
+            try:
+                yield (i + 1, _extract_page(page, self.cleaner), None)
+            except Exception as e:
+                yield (i + 1, '', f'{type(e).__name__}: {e}')
+
+    def iter_load(self, source_path: str, fingerprint: dict=None) -> Iterator[Document]:
+        if not os.path.exists(source_path):
+            raise FileNotFoundError(f'El archivo {source_path} no existe.')
+        resumed = time.perf_counter()
+        busy = 0.0
+        cache_key = self._cache_key(source_path, fingerprint) if self.page_cache is not None else None
+        cached = self.page_cache.get_file(cache_key) if cache_key else None
+        if cached is not None:
+            num_pages, pages = cached
+            self.page_counts[source_path] = num_pages
+            self.page_errors[source_path] = []
+            echo(f'⚡ {num_pages} páginas de {source_path} servidas desde la caché de texto (sin pypdf).')
+            telemetry.observe('ingestion.load', time.perf_counter() - resumed, source=source_path, pages=num_pages, cached=True)
+            telemetry.incr('pages_loaded', num_pages)
+            for page, text in pages.items():
+                if len(text) > settings.MIN_PAGE_CHARS:
+                    yield self._to_document(source_path, page, text)
+            return
+        reader = pypdf.PdfReader(source_path)
+        self.page_counts[source_path] = len(reader.pages)
+        errors = self.page_errors[source_path] = []
+        extracted = []
+        for page, text, error in self._iter_pages(source_path, reader):
+            if error:
+                echo(f'⚠️ {source_path} pág. {page}: {error}')
+                errors.append((page, error))
+                continue
+            extracted.append((page, text))
+            if len(text) > settings.MIN_PAGE_CHARS:
+                busy += time.perf_counter() - resumed
+                yield self._to_document(source_path, page, text)
+                resumed = time.perf_counter()
+        if cache_key and (not errors):
+            self.page_cache.put_file(cache_key, len(reader.pages), extracted)
+        telemetry.observe('ingestion.load', busy + time.perf_counter() - resumed, source=source_path, pages=len(reader.pages), cached=False)
+        telemetry.incr('pages_loaded', len(reader.pages))
+        telemetry.incr('page_errors', len(errors))
 
     def load(self, source_path: str) -> List[Document]:
         if not os.path.exists(source_path):
             raise FileNotFoundError(f'El archivo {source_path} no existe.')
-        print(f'📄 Cargando archivo (Lightweight): {source_path}')
-        docs = []
+        echo(f'📄 Cargando archivo (Lightweight): {source_path}')
         try:
-            reader = pypdf.PdfReader(source_path)
-            for i, page in enumerate(reader.pages):
-                raw_text = page.extract_text() or ''
-                cleaned_text = self.cleaner.clean(raw_text)
-                if len(cleaned_text) > 50:
-                    doc = Document(page_content=cleaned_text, metadata={'source': source_path, 'page': i + 1, 'cleaned': True, 'char_count': len(cleaned_text)})
-                    docs.append(doc)
-            print(f'✅ Procesadas {len(docs)} páginas útiles de {len(reader.pages)} totales.')
-            return docs
+            docs = list(self.iter_load(source_path))
         except Exception as e:
-            print(f'❌ Error leyendo PDF: {e}')
-            return []
\ No newline at end of file
+            echo(f'❌ Error leyendo PDF: {e}')
+            return []
+        errors = self.page_errors.get(source_path, [])
+        echo(f"✅ Procesadas {len(docs)} páginas útiles de {self.page_counts[source_path]} totales{(f' ({len(errors)} con errores)' if errors else '')}.")
+        return docs
@@ -0,0 +1,112 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+from typing import Dict, List, Tuple
+from core.config import settings
+
+def file_sha256(path: str, block_size: int=1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def source_key(path: str) -> str:
+    return os.path.relpath(os.path.abspath(path), settings.SOURCE_ROOT).replace(os.sep, '/')
+
+def manifest_path(tenant: str=None) -> str:
+    if not tenant:
+        return settings.INGESTION_MANIFEST_PATH
+    root, ext = os.path.splitext(settings.INGESTION_MANIFEST_PATH)
+    return f'{root}.{tenant}{ext}'
+
+def tenant_manifest_paths() -> List[str]:
+    root, ext = os.path.splitext(settings.INGESTION_MANIFEST_PATH)
+    return sorted(glob.glob(f'{glob.escape(root)}.*{ext}'))
+
+def _mtime_ns(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def manifest_version(path: str=None) -> Tuple[Tuple[str, int], ...]:
+    paths = [path] if path else [settings.INGESTION_MANIFEST_PATH, *tenant_manifest_paths()]
+    return tuple(((p, _mtime_ns(p)) for p in paths))
+
+class IngestionPlan:
+
+    def __init__(self):
+        self.pending: Dict[str, dict] = {}
+        self.unchanged: List[str] = []
+        self.removed: List[str] = []
+
+    def summary(self) -> str:
+        return f'{len(self.pending)} nuevos/modificados, {len(self.unchanged)} sin cambios, {len(self.removed)} eliminados'
+
+class IngestionManifest:
+
+    def __init__(self, path: str=None):
+        self.path = path or settings.INGESTION_MANIFEST_PATH
+        self.entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.dirty = False
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f).get('sources', {})
+
+    def save(self):
+        if not self.dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with self._lock:
+            payload = {'version': 1, 'updated_at': time.time(), 'sources': self.entries}
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+            self.dirty = True
+
+    def point_ids(self, source: str) -> List[str]:
+        return self.entries.get(source, {}).get('point_ids', [])
+
+    def plan(self, sources: List[str], prune: bool=True) -> IngestionPlan:
+        plan = IngestionPlan()
+        for source in sources:
+            stat = os.stat(source)
+            fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            entry = self.entries.get(source_key(source))
+            if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                plan.unchanged.append(source)
+                continue
+            fingerprint['sha256'] = file_sha256(source)
+            if entry and entry.get('sha256') == fingerprint['sha256']:
+                entry.update(fingerprint)
+                self.dirty = True
+                plan.unchanged.append(source)
+                continue
+            plan.pending[source] = fingerprint
+        if prune:
+            seen = {source_key(source) for source in sources}
+            plan.removed = [source for source in self.entries if source not in seen]
+        return plan
+
+    def record(self, source: str, fingerprint: dict, point_ids: List[str]):
+        with self._lock:
+            self.entries[source] = {**fingerprint, 'point_ids': list(point_ids), 'indexed_at': time.time()}
+            self.dirty = True
+
+    def forget(self, source: str):
+        with self._lock:
+            if self.entries.pop(source, None) is not None:
+                self.dirty = True
@@ -0,0 +1,40 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+from core.config import settings
+
+class PageTextCache:
+
+    def __init__(self, path: str=None):
+        self.path = path or settings.PAGE_CACHE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS pages (file_key TEXT NOT NULL, page INTEGER NOT NULL, text TEXT NOT NULL, PRIMARY KEY (file_key, page))')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS files (file_key TEXT PRIMARY KEY, num_pages INTEGER NOT NULL)')
+        self._conn.commit()
+
+    def get_file(self, file_key: str) -> Optional[Tuple[int, Dict[int, str]]]:
+        with self._lock:
+            row = self._conn.execute('SELECT num_pages FROM files WHERE file_key = ?', (file_key,)).fetchone()
+            if row is None:
+                return None
+            pages = dict(self._conn.execute('SELECT page, text FROM pages WHERE file_key = ? ORDER BY page', (file_key,)).fetchall())
+        return (row[0], pages)
+
+    def put_file(self, file_key: str, num_pages: int, pages: List[Tuple[int, str]]):
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO pages (file_key, page, text) VALUES (?, ?, ?)', [(file_key, page, text) for page, text in pages])
+            self._conn.execute('INSERT OR REPLACE INTO files (file_key, num_pages) VALUES (?, ?)', (file_key, num_pages))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute('DELETE FROM pages')
+            self._conn.execute('DELETE FROM files')
+            self._conn.commit()
@@ -0,0 +1,154 @@
+import os
+import glob
+import time
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Set, Tuple
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import get_echo, telemetry
+from ingestion.loaders import PDFLoader
+from ingestion.splitters import MedicalTextSplitter
+echo = get_echo(__name__)
+_SENTINEL = None
+
+def discover_pdfs(input_path: str) -> List[str]:
+    if os.path.isdir(input_path):
+        pattern = os.path.join(input_path, '**', '*.pdf')
+    else:
+        pattern = input_path
+    return sorted((p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p)))
+
+def _extract_pages(source_path: str, fingerprint: dict=None) -> Tuple[List[Document], float, List[Tuple[int, str]]]:
+    start = time.perf_counter()
+    loader = PDFLoader(workers=1)
+    docs = list(loader.iter_load(source_path, fingerprint))
+    return (docs, time.perf_counter() - start, loader.page_errors.get(source_path, []))
+
+class StageStats:
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.count = 0
+        self.busy_seconds = 0.0
+
+    def add(self, count: int, seconds: float):
+        self.count += count
+        self.busy_seconds += seconds
+
+    def report(self, wall_seconds: float) -> str:
+        busy_rate = self.count / self.busy_seconds if self.busy_seconds else 0.0
+        wall_rate = self.count / wall_seconds if wall_seconds else 0.0
+        return f'{self.name:<12} {self.count:>8} {self.unit:<8} | {wall_rate:>9.1f} {self.unit}/s (wall) | {busy_rate:>9.1f} {self.unit}/s (busy)'
+
+class ParallelIngestionPipeline:
+
+    def __init__(self, vector_db, splitter: MedicalTextSplitter=None, workers: int=None, queue_size: int=None, batch_size: int=None, on_source_indexed: Callable[[str, List[str]], None]=None):
+        self.vector_db = vector_db
+        self.on_source_indexed = on_source_indexed
+        self.splitter = splitter if splitter else MedicalTextSplitter()
+        self.workers = workers or settings.INGESTION_WORKERS
+        self.queue_size = queue_size or settings.INGESTION_QUEUE_SIZE
+        self.batch_size = batch_size or settings.INGESTION_BATCH_SIZE
+        self.extract_stats = StageStats('extract', 'pages')
+        self.split_stats = StageStats('split', 'chunks')
+        self.embed_stats = StageStats('embed+upsert', 'vectors')
+        self._consumer_error = None
+        self._indexed_ids: Dict[str, List[str]] = {}
+        self._incomplete: Set[str] = set()
+
+    def _embed_worker(self, chunk_queue: queue.Queue):
+        while True:
+            item = chunk_queue.get()
+            if item is _SENTINEL:
+                return
+            if self._consumer_error is not None:
+                continue
+            source, batch, is_last = item
+            try:
+                if batch:
+                    start = time.perf_counter()
+                    self.vector_db.upload_documents(batch)
+                    self.embed_stats.add(len(batch), time.perf_counter() - start)
+                ids = self._indexed_ids.setdefault(source, [])
+                ids.extend((d.metadata['doc_id'] for d in batch))
+                if is_last:
+                    self._indexed_ids.pop(source)
+                    if self.on_source_indexed and source not in self._incomplete:
+                        self.on_source_indexed(source, ids)
+            except Exception as e:
+                echo(f'❌ Error en etapa de embedding/upsert: {e}')
+                self._consumer_error = e
+
+    def _enqueue_chunks(self, chunk_queue: queue.Queue, source: str, chunks: List[Document]):
+        starts = range(0, len(chunks), self.batch_size) if chunks else [0]
+        for i in starts:
+            if self._consumer_error is not None:
+                raise self._consumer_error
+            chunk_queue.put((source, chunks[i:i + self.batch_size], i + self.batch_size >= len(chunks)))
+
+    def run(self, sources: List[str], fingerprints: Dict[str, dict]=None):
+        if not sources:
+            echo('⚠️ No se encontraron PDFs para ingerir.')
+            return
+        echo(f'🏭 Ingesta paralela: {len(sources)} archivos, {self.workers} workers, cola de {self.queue_size} lotes.')
+        start_time = time.perf_counter()
+        chunk_queue = queue.Queue(maxsize=self.queue_size)
+        consumer = threading.Thread(target=self._embed_worker, args=(chunk_queue,), daemon=True)
+        consumer.start()
+        pending_sources = iter(sources)
+        fingerprints = fingerprints or {}
+        max_in_flight = self.workers * 2
+        failed = []
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                in_flight = {}
+                for source in pending_sources:
+                    in_flight[pool.submit(_extract_pages, source, fingerprints.get(source))] = source
+                    if len(in_flight) >= max_in_flight:
+                        break
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        source = in_flight.pop(future)
+                        next_source = next(pending_sources, None)
+                        if next_source is not None:
+                            in_flight[pool.submit(_extract_pages, next_source, fingerprints.get(next_source))] = next_source
+                        try:
+                            pages, extract_seconds, page_errors = future.result()
+                        except Exception as e:
+                            echo(f'❌ Error extrayendo {source}: {e}')
+                            failed.append(source)
+                            continue
+                        if not pages:
+                            echo(f'⚠️ {source} no produjo páginas útiles; se reintentará en la próxima ingesta.')
+                            failed.append(source)
+                            continue
+                        if page_errors:
+                            echo(f'⚠️ {source}: {len(page_errors)} páginas fallaron ({[page for page, _ in page_errors]}); se indexa el resto y el archivo se reintentará en la próxima ingesta.')
+                            self._incomplete.add(source)
+                            failed.append(source)
+                        self.extract_stats.add(len(pages), extract_seconds)
+                        telemetry.observe('ingestion.load', extract_seconds, source=source, pages=len(pages))
+                        telemetry.incr('pages_loaded', len(pages))
+                        split_start = time.perf_counter()
+                        chunks = self.splitter.split_documents(pages)
+                        self.split_stats.add(len(chunks), time.perf_counter() - split_start)
+                        self._enqueue_chunks(chunk_queue, source, chunks)
+        finally:
+            chunk_queue.put(_SENTINEL)
+            consumer.join()
+        if self._consumer_error is not None:
+            raise self._consumer_error
+        wall_seconds = time.perf_counter() - start_time
+        echo('\n📈 Throughput por etapa:')
+        for stats in (self.extract_stats, self.split_stats, self.embed_stats):
+            echo(f'   {stats.report(wall_seconds)}')
+        if failed:
+            echo(f'⚠️ {len(failed)} archivos fallaron: {failed}')
+        echo(f'⏱️ Ingesta paralela finalizada en {wall_seconds:.2f} segundos.')
+        telemetry.observe('ingestion.pipeline', wall_seconds, sources=len(sources))
+        telemetry.report()
+        telemetry.flush()
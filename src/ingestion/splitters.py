@@ -1,29 +1,121 @@
+import re
 import uuid
-from typing import List
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import hashlib
+from functools import lru_cache
+import numpy as np
+from typing import List, Tuple
 from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import get_echo, telemetry
+echo = get_echo(__name__)
+CHUNK_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, 'medirag/chunks')
+_FALLBACK_TOKEN_RE = re.compile('(\\w{1,6}|[^\\w\\s])', re.UNICODE)
+_SENTENCE_END_CODES = np.array([ord(c) for c in '.!?;:'], dtype=np.uint32)
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+def chunk_id(*parts) -> str:
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, '|'.join((str(p) for p in parts))))
+
+class RegexTokenizer:
+
+    def token_offsets(self, text: str) -> np.ndarray:
+        parts = _FALLBACK_TOKEN_RE.split(text)
+        bounds = np.cumsum(np.fromiter(map(len, parts), dtype=np.int64, count=len(parts)))
+        return np.stack((bounds[0:-1:2], bounds[1::2]), axis=1)
+
+class HFTokenizer:
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+
+    def token_offsets(self, text: str) -> np.ndarray:
+        offsets = np.array(self.tokenizer.encode(text, add_special_tokens=False).offsets, dtype=np.int64).reshape(-1, 2)
+        return offsets[offsets[:, 1] > offsets[:, 0]]
+
+@lru_cache(maxsize=None)
+def load_tokenizer(model_name: str=None):
+    model_name = model_name or settings.EMBEDDING_MODEL_NAME
+    try:
+        from huggingface_hub import hf_hub_download
+        from tokenizers import Tokenizer
+        try:
+            path = hf_hub_download(model_name, 'tokenizer.json', local_files_only=True)
+        except Exception:
+            path = hf_hub_download(model_name, 'tokenizer.json')
+        return HFTokenizer(Tokenizer.from_file(path))
+    except Exception as e:
+        echo(f'⚠️ Tokenizer de {model_name} no disponible ({type(e).__name__}); se usa una aproximación por regex.')
+        return RegexTokenizer()
+
+def _gap_strengths(text: str, offsets: np.ndarray) -> np.ndarray:
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    newlines = np.concatenate(([0], np.cumsum(codes == 10)))
+    gap_start, gap_end = (offsets[:-1, 1], offsets[1:, 0])
+    breaks = newlines[gap_end] - newlines[gap_start]
+    sentence_end = np.isin(codes[gap_start - 1], _SENTENCE_END_CODES)
+    strengths = np.where(breaks > 1, 4, np.where(breaks == 1, 3, np.where(gap_end > gap_start, np.where(sentence_end, 2, 1), 0)))
+    return np.append(strengths, 4)
+
+def _windows(strengths: np.ndarray, start: int, stop: int, size: int, overlap: int) -> List[Tuple[int, int]]:
+    windows = []
+    while start < stop:
+        end = min(start + size, stop)
+        if end < stop:
+            lo = start + size // 2
+            segment = strengths[lo:end][::-1]
+            end = int(end - np.argmax(segment))
+        windows.append((start, end))
+        if end >= stop:
+            break
+        next_start = max(end - overlap, start + 1)
+        word_starts = np.flatnonzero(strengths[next_start - 1:end - 1])
+        start = next_start + int(word_starts[0]) if word_starts.size else end
+    return windows
 
 class MedicalTextSplitter:
 
-    def __init__(self, parent_chunk_size=2000, child_chunk_size=400):
-        self.parent_splitter = RecursiveCharacterTextSplitter(chunk_size=parent_chunk_size, chunk_overlap=200, separators=['\n\n', '\n', '.', ' ', ''])
-        self.child_splitter = RecursiveCharacterTextSplitter(chunk_size=child_chunk_size, chunk_overlap=50)
+    def __init__(self, parent_tokens: int=None, child_tokens: int=None, parent_overlap: int=None, child_overlap: int=None, tokenizer=None, tenant: str=None):
+        self.parent_tokens = parent_tokens or settings.SPLITTER_PARENT_TOKENS
+        self.child_tokens = min(child_tokens or settings.SPLITTER_CHILD_TOKENS, settings.EMBEDDING_MAX_TOKENS - 2)
+        self.parent_overlap = settings.SPLITTER_PARENT_OVERLAP if parent_overlap is None else parent_overlap
+        self.child_overlap = settings.SPLITTER_CHILD_OVERLAP if child_overlap is None else child_overlap
+        self.tokenizer = tokenizer if tokenizer else load_tokenizer()
+        self.tenant = tenant
+
+    def split_document(self, doc: Document) -> List[Document]:
+        text = doc.page_content
+        offsets = self.tokenizer.token_offsets(text)
+        if not len(offsets):
+            return []
+        strengths = _gap_strengths(text, offsets)
+        bounds = offsets.tolist()
+        source = doc.metadata.get('source', '')
+        page = doc.metadata.get('page', '')
+        scope = (self.tenant,) if self.tenant else ()
+        metadata = {**doc.metadata, settings.TENANT_FIELD: self.tenant} if self.tenant else doc.metadata
+        chunks = []
+        for p_idx, (p_start, p_end) in enumerate(_windows(strengths, 0, len(offsets), self.parent_tokens, self.parent_overlap)):
+            span_start = bounds[p_start][0]
+            span_end = bounds[p_end - 1][1]
+            parent_text = text[span_start:span_end]
+            parent_hash = content_hash(parent_text)
+            parent_id = chunk_id(*scope, source, page, p_idx, parent_hash)
+            chunks.append(Document(page_content=parent_text, metadata={**metadata, 'doc_id': parent_id, 'content_hash': parent_hash, 'type': 'parent', 'page_span': [span_start, span_end], 'token_count': p_end - p_start}))
+            for c_idx, (c_start, c_end) in enumerate(_windows(strengths, p_start, p_end, self.child_tokens, self.child_overlap)):
+                start, end = (bounds[c_start][0], bounds[c_end - 1][1])
+                child_text = text[start:end]
+                child_hash = content_hash(child_text)
+                chunks.append(Document(page_content=child_text, metadata={**metadata, 'parent_id': parent_id, 'doc_id': chunk_id(parent_id, c_idx, child_hash), 'content_hash': child_hash, 'type': 'child', 'parent_span': [start - span_start, end - span_start], 'token_count': c_end - c_start}))
+        return chunks
 
     def split_documents(self, docs: List[Document]) -> List[Document]:
-        all_chunks = []
-        print('🔪 Iniciando proceso de Splitting (Parent-Child)...')
-        for doc in docs:
-            parent_chunks = self.parent_splitter.split_documents([doc])
-            for parent in parent_chunks:
-                parent_id = str(uuid.uuid4())
-                parent.metadata['doc_id'] = parent_id
-                parent.metadata['type'] = 'parent'
-                all_chunks.append(parent)
-                child_chunks = self.child_splitter.split_documents([parent])
-                for child in child_chunks:
-                    child.metadata['parent_id'] = parent_id
-                    child.metadata['doc_id'] = str(uuid.uuid4())
-                    child.metadata['type'] = 'child'
-                    all_chunks.append(child)
-        print(f'🧩 Splitting completado. Generados {len(all_chunks)} chunks totales.')
-        return all_chunks
\ No newline at end of file
+        echo('🔪 Iniciando proceso de Splitting (Parent-Child)...')
+        with telemetry.span('ingestion.split', pages=len(docs)):
+            all_chunks = [chunk for doc in docs for chunk in self.split_document(doc)]
+        telemetry.incr('chunks_created', len(all_chunks))
+        echo(f'🧩 Splitting completado. Generados {len(all_chunks)} chunks totales.')
+        return all_chunks
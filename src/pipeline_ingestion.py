@@ -1,26 +1,102 @@
 import time
+import argparse
+from contextlib import nullcontext
+from itertools import islice
+from core.config import settings
+from core.telemetry import configure_logging, get_echo, telemetry
 from ingestion.loaders import PDFLoader
 from ingestion.splitters import MedicalTextSplitter
+from ingestion.parallel import ParallelIngestionPipeline, discover_pdfs
+from ingestion.manifest import IngestionManifest, manifest_path, source_key, tenant_manifest_paths
 from vector_store.store import VectorDBService
 import os
+echo = get_echo(__name__)
 
-def run_pipeline():
+def _batched(iterable, size: int):
+    iterator = iter(iterable)
+    while (batch := list(islice(iterator, size))):
+        yield batch
+
+def _prepare_incremental(vector_db: VectorDBService, manifest: IngestionManifest, sources, recreate: bool=False, prune: bool=True):
+    if recreate:
+        vector_db.force_recreate_collection()
+        manifest.clear()
+        if not vector_db.tenant and settings.TENANT_ROUTING == 'payload':
+            for path in tenant_manifest_paths():
+                echo(f'🧾 La colección compartida se ha recreado: se descarta el manifiesto de tenant {path}.')
+                os.remove(path)
+    plan = manifest.plan(sources, prune=prune)
+    echo(f'🧾 Manifiesto de ingesta: {plan.summary()}.')
+    for source in plan.removed:
+        vector_db.delete_points(manifest.point_ids(source))
+        manifest.forget(source)
+
+    def on_source_indexed(source, point_ids):
+        key = source_key(source)
+        stale_ids = set(manifest.point_ids(key)) - set(point_ids)
+        vector_db.delete_points(stale_ids)
+        manifest.record(key, plan.pending[source], point_ids)
+    return (plan, on_source_indexed)
+
+def run_pipeline(pdf_path: str='data/raw/sample_medical_paper.pdf', recreate: bool=False, tenant: str=None):
     start_time = time.time()
-    pdf_path = 'data/raw/sample_medical_paper.pdf'
     if not os.path.exists(pdf_path):
-        print('⚠️ Archivo no encontrado. Ejecuta src/test_ingestion.py primero.')
+        echo('⚠️ Archivo no encontrado. Ejecuta src/test_ingestion.py primero.')
         return
-    print('\n--- PASO 1: EXTRACCIÓN ---')
-    loader = PDFLoader()
-    raw_docs = loader.load(pdf_path)
-    print('\n--- PASO 2: TRANSFORMACIÓN (SPLITTING) ---')
-    splitter = MedicalTextSplitter()
-    chunks = splitter.split_documents(raw_docs)
-    print('\n--- PASO 3: CARGA (VECTORIZACIÓN & STORAGE) ---')
-    vector_db = VectorDBService()
-    vector_db.force_recreate_collection()
-    vector_db.upload_documents(chunks)
+    vector_db = VectorDBService(tenant=tenant)
+    manifest = IngestionManifest(manifest_path(tenant))
+    plan, on_source_indexed = _prepare_incremental(vector_db, manifest, [pdf_path], recreate=recreate, prune=False)
+    if pdf_path in plan.pending:
+        echo(f'\n--- EXTRACCIÓN → SPLITTING → CARGA (streaming en lotes de {settings.INGESTION_PAGE_BATCH} páginas) ---')
+        loader = PDFLoader()
+        splitter = MedicalTextSplitter(tenant=tenant)
+        point_ids = []
+        with vector_db.bulk_indexing() if recreate else nullcontext():
+            for pages in _batched(loader.iter_load(pdf_path, plan.pending[pdf_path]), settings.INGESTION_PAGE_BATCH):
+                chunks = splitter.split_documents(pages)
+                vector_db.upload_documents(chunks)
+                point_ids.extend((d.metadata['doc_id'] for d in chunks))
+        errors = loader.page_errors.get(pdf_path, [])
+        if errors:
+            echo(f'⚠️ {len(errors)} páginas fallaron ({[page for page, _ in errors]}); el archivo se reintentará en la próxima ingesta.')
+        elif not point_ids:
+            echo('⚠️ El archivo no produjo páginas útiles; se conservan sus puntos anteriores y se reintentará en la próxima ingesta.')
+        else:
+            on_source_indexed(pdf_path, point_ids)
+    else:
+        echo('✅ Sin cambios desde la última ingesta. Nada que vectorizar.')
+    manifest.save()
     end_time = time.time()
-    print(f'\n⏱️ Pipeline finalizado en {end_time - start_time:.2f} segundos.')
+    echo(f'\n⏱️ Pipeline finalizado en {end_time - start_time:.2f} segundos.')
+    telemetry.observe('ingestion.pipeline', end_time - start_time, sources=1)
+    telemetry.report()
+    telemetry.flush()
+
+def run_parallel_pipeline(input_path: str, workers: int=None, queue_size: int=None, recreate: bool=False, tenant: str=None):
+    sources = [os.path.normpath(p) for p in discover_pdfs(input_path)]
+    echo(f'📚 {len(sources)} PDFs encontrados en {input_path}')
+    vector_db = VectorDBService(tenant=tenant)
+    manifest = IngestionManifest(manifest_path(tenant))
+    plan, on_source_indexed = _prepare_incremental(vector_db, manifest, sources, recreate=recreate)
+    pipeline = ParallelIngestionPipeline(vector_db, splitter=MedicalTextSplitter(tenant=tenant), workers=workers, queue_size=queue_size, on_source_indexed=on_source_indexed)
+    try:
+        with vector_db.bulk_indexing():
+            pipeline.run(list(plan.pending), fingerprints=plan.pending)
+    finally:
+        manifest.save()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Pipeline de ingestión de MediRAG (ETL -> VectorDB).')
+    parser.add_argument('--input', help=f'Archivo, directorio o glob de PDFs (p.ej. {settings.RAW_DATA_DIR} o "{settings.RAW_DATA_DIR}/*.pdf"). Activa el modo paralelo.')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos de extracción (por defecto: núcleos disponibles).')
+    parser.add_argument('--queue-size', type=int, default=None, help='Lotes máximos en cola hacia la etapa de embedding.')
+    parser.add_argument('--tenant', default=None, help=f'Departamento/tenant de los documentos (payload `{settings.TENANT_FIELD}`; colección propia si TENANT_ROUTING=collection).')
+    parser.add_argument('--recreate', action='store_true', help='Borra y recrea la colección (y el manifiesto) antes de ingerir.')
+    return parser.parse_args()
 if __name__ == '__main__':
-    run_pipeline()
\ No newline at end of file
+    configure_logging()
+    args = parse_args()
+    if args.input:
+        run_parallel_pipeline(args.input, workers=args.workers, queue_size=args.queue_size, recreate=args.recreate, tenant=args.tenant)
+    else:
+        run_pipeline(recreate=args.recreate, tenant=args.tenant)
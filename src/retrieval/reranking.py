@@ -1,23 +1,118 @@
-from typing import List
+import time
+import hashlib
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+import numpy as np
 from langchain_core.documents import Document
-from flashrank import Ranker, RerankRequest
+from flashrank import Ranker
+from core.config import settings
+from core.telemetry import get_echo, telemetry
+from core.lru import LRUCache
+echo = get_echo(__name__)
+
+def select_reranker_model(latency_budget_ms: float, num_candidates: int=None) -> str:
+    num_candidates = num_candidates or settings.RERANK_EXPECTED_CANDIDATES
+    for model_name, cost_ms in settings.RERANKER_MODEL_COSTS_MS.items():
+        if cost_ms * num_candidates <= latency_budget_ms:
+            return model_name
+    return list(settings.RERANKER_MODEL_COSTS_MS)[-1]
+
+def query_key(query: str) -> bytes:
+    return hashlib.blake2b(' '.join(query.lower().split()).encode('utf-8'), digest_size=8).digest()
+
+def passage_key(doc: Document) -> str:
+    return doc.metadata.get('doc_id') or hashlib.blake2b(doc.page_content.encode('utf-8'), digest_size=16).hexdigest()
 
 class RerankerService:
 
-    def __init__(self, model_name='ms-marco-MiniLM-L-12-v2'):
-        print(f'⚖️ Inicializando Reranker ({model_name})...')
-        self.ranker = Ranker(model_name=model_name, cache_dir='models')
+    def __init__(self, model_name: str=None, ranker: Ranker=None, latency_budget_ms: float=None, max_length: int=None, cache_size: int=None, prune_margin: float=None):
+        latency_budget_ms = settings.RERANK_LATENCY_BUDGET_MS if latency_budget_ms is None else latency_budget_ms
+        if model_name is None:
+            model_name = select_reranker_model(latency_budget_ms) if latency_budget_ms else settings.RERANKER_MODEL
+        self.model_name = model_name
+        self.max_length = max_length or settings.RERANK_MAX_LENGTH
+        self.max_chars = self.max_length * settings.RERANK_CHARS_PER_TOKEN
+        self.prune_margin = settings.RERANK_PRUNE_MARGIN if prune_margin is None else prune_margin
+        if ranker is None:
+            echo(f'⚖️ Inicializando Reranker ({model_name}, ventana {self.max_length} tokens)...')
+            ranker = Ranker(model_name=model_name, cache_dir='models', max_length=self.max_length)
+        self.ranker = ranker
+        self.score_cache = LRUCache(settings.RERANK_CACHE_SIZE if cache_size is None else cache_size)
+        self.latencies_ms = deque(maxlen=1000)
+        self.pairs_scored = 0
+        self.pruned = 0
+        self._lock = threading.Lock()
+
+    def _score_pairs(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        scores = np.empty(len(pairs), dtype=np.float32)
+        order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][1]))
+        for start in range(0, len(order), settings.RERANK_MAX_BATCH_PAIRS):
+            chunk = order[start:start + settings.RERANK_MAX_BATCH_PAIRS]
+            encoded = self.ranker.tokenizer.encode_batch([list(pairs[i]) for i in chunk])
+            onnx_input = {'input_ids': np.array([e.ids for e in encoded], dtype=np.int64), 'attention_mask': np.array([e.attention_mask for e in encoded], dtype=np.int64)}
+            token_type_ids = np.array([e.type_ids for e in encoded], dtype=np.int64)
+            if np.any(token_type_ids):
+                onnx_input['token_type_ids'] = token_type_ids
+            logits = self.ranker.session.run(None, onnx_input)[0]
+            if logits.shape[1] == 1:
+                chunk_scores = 1 / (1 + np.exp(-logits.flatten()))
+            else:
+                exp_logits = np.exp(logits)
+                chunk_scores = exp_logits[:, 1] / np.sum(exp_logits, axis=1)
+            scores[chunk] = chunk_scores
+        return scores
+
+    def warmup(self):
+        self._score_pairs([('warmup', 'warmup')])
+
+    def _prune(self, docs: List[Document], top_n: int) -> List[Document]:
+        scored = sorted((d.metadata['retrieval_score'] for d in docs if 'retrieval_score' in d.metadata), reverse=True)
+        if self.prune_margin <= 0 or len(scored) <= top_n or any((d.metadata.get('retrieval_fused') for d in docs)):
+            return docs
+        floor = scored[top_n - 1] - self.prune_margin
+        return [d for d in docs if d.metadata.get('retrieval_score', floor) >= floor]
+
+    def rerank_batch(self, requests: List[Tuple[str, List[Document], int]]) -> List[List[Document]]:
+        start = time.perf_counter()
+        plans = []
+        pending: Dict[Tuple[bytes, str], Tuple[str, str]] = {}
+        pruned = 0
+        for query, docs, top_n in requests:
+            kept = self._prune(docs, top_n)
+            pruned += len(docs) - len(kept)
+            q_key = query_key(query)
+            keys = [(q_key, passage_key(d)) for d in kept]
+            plans.append((kept, keys, top_n))
+            for key, doc in zip(keys, kept):
+                pending.setdefault(key, (query, doc.page_content[:self.max_chars]))
+        scores = self.score_cache.get_many(list(pending))
+        missing = [key for key in pending if key not in scores]
+        if missing:
+            fresh = dict(zip(missing, self._score_pairs([pending[key] for key in missing]).tolist()))
+            self.score_cache.put_many(fresh)
+            scores.update(fresh)
+        results = []
+        for kept, keys, top_n in plans:
+            ranked = sorted(zip(kept, keys), key=lambda item: scores[item[1]], reverse=True)[:top_n]
+            results.append([Document(page_content=d.page_content, metadata={**d.metadata, 'rerank_score': scores[key]}) for d, key in ranked])
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies_ms.append(elapsed * 1000)
+            self.pairs_scored += len(missing)
+            self.pruned += pruned
+        telemetry.observe('rerank', elapsed, queries=len(requests), pairs=len(pending))
+        telemetry.incr('rerank_pairs_scored', len(missing))
+        telemetry.incr('rerank_candidates_pruned', pruned)
+        return results
 
     def rerank_documents(self, query: str, docs: List[Document], top_n: int=5) -> List[Document]:
         if not docs:
             return []
-        passages = [{'id': d.metadata.get('doc_id', str(i)), 'text': d.page_content, 'meta': d.metadata} for i, d in enumerate(docs)]
-        rerank_request = RerankRequest(query=query, passages=passages)
-        results = self.ranker.rerank(rerank_request)
-        final_docs = []
-        for res in results[:top_n]:
-            original_meta = res['meta']
-            original_meta['rerank_score'] = res['score']
-            doc = Document(page_content=res['text'], metadata=original_meta)
-            final_docs.append(doc)
-        return final_docs
\ No newline at end of file
+        results = self.rerank_batch([(query, docs, top_n)])[0]
+        echo(f'⚖️ Rerank ({self.model_name}): {len(docs)} candidatos en {self.latencies_ms[-1]:.1f} ms | caché de scores {self.score_cache.hit_rate():.0%}')
+        return results
+
+    def stats(self) -> dict:
+        latencies = np.asarray(self.latencies_ms) if self.latencies_ms else np.zeros(1)
+        return {'model': self.model_name, 'calls': len(self.latencies_ms), 'p50_ms': float(np.percentile(latencies, 50)), 'p95_ms': float(np.percentile(latencies, 95)), 'pairs_scored': self.pairs_scored, 'pruned': self.pruned, 'cache_hit_rate': self.score_cache.hit_rate()}
@@ -1,46 +1,313 @@
-from typing import List
-from qdrant_client import QdrantClient, models
-from langchain_huggingface import HuggingFaceEmbeddings
+import time
+import asyncio
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
 from langchain_core.documents import Document
 from core.config import settings
+from core.telemetry import get_echo, telemetry
+from core.resources import registry
+from core.batching import AsyncMicroBatcher
+from core.lru import LRUCache
+from vector_store.docstore import ParentDocStore
+from vector_store.sparse import BM25SparseEncoder
+from vector_store.profiles import get_profile, search_params
+from vector_store.filters import build_conditions, route_collections, unindexed_fields
 from retrieval.reranking import RerankerService
+echo = get_echo(__name__)
+CHILD_PAYLOAD_FIELDS = ['parent_id']
+CONNECTION_ERROR_MARKERS = ('Connection refused', 'Cannot connect', 'All connection attempts failed')
 
 class VectorDBConnectionError(Exception):
     pass
 
 class MedicalRetriever:
 
-    def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL)
-        self.embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    def __init__(self, client: QdrantClient=None, embeddings=None, reranker: RerankerService=None, parent_store: ParentDocStore=None, async_client: AsyncQdrantClient=None, mode: str=None, hybrid: bool=None, profile: str=None, filters: Dict[str, object]=None, tenants: Iterable[str]=None):
+        self.client = client if client else registry.qdrant_client()
+        self.embeddings = embeddings if embeddings else registry.embeddings()
         self.collection = settings.COLLECTION_NAME
-        self.reranker = RerankerService()
+        self.reranker = reranker if reranker else registry.reranker()
+        if parent_store is None and settings.PARENT_STORE == 'docstore':
+            parent_store = registry.parent_store()
+        self.parent_store = parent_store
+        self.mode = mode or settings.RETRIEVAL_MODE
+        self.hybrid = settings.HYBRID_SEARCH if hybrid is None else hybrid
+        self.sparse_encoder = BM25SparseEncoder() if self.hybrid else None
+        self.search_params = search_params(get_profile(profile))
+        self.parent_cache = LRUCache(settings.PARENT_CACHE_SIZE)
+        self.filters = dict(filters or {})
+        self.tenants = list(tenants) if tenants else None
+        self._async_client = async_client
+        self._executor = None
+        self._fanout_executor = None
+        self._warned_fields = set()
+        self._embed_batcher = None
+        self._rerank_batcher = None
 
-    def search(self, query: str, k: int=5) -> List[Document]:
-        try:
-            fetch_k = k * 4
-            print(f"🔍 Vector Search (Broad): '{query}' buscando {fetch_k} candidatos...")
-            query_vector = self.embeddings.embed_query(query)
-            search_result = self.client.query_points(collection_name=self.collection, query=query_vector, query_filter=models.Filter(must=[models.FieldCondition(key='type', match=models.MatchValue(value='child'))]), limit=fetch_k)
-            if not search_result.points:
-                return []
-            parent_ids = set()
-            for hit in search_result.points:
+    @property
+    def async_client(self) -> AsyncQdrantClient:
+        if self._async_client is None:
+            self._async_client = AsyncQdrantClient(url=settings.QDRANT_URL)
+        return self._async_client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=settings.ASYNC_EXECUTOR_WORKERS, thread_name_prefix='retrieval-cpu')
+        return self._executor
+
+    @property
+    def fanout_executor(self) -> ThreadPoolExecutor:
+        if self._fanout_executor is None:
+            self._fanout_executor = ThreadPoolExecutor(max_workers=settings.TENANT_FANOUT_WORKERS, thread_name_prefix='qdrant-fanout')
+        return self._fanout_executor
+
+    @property
+    def embed_batcher(self) -> AsyncMicroBatcher:
+        if self._embed_batcher is None:
+            self._embed_batcher = AsyncMicroBatcher(self.embed_queries, self.executor, settings.MICROBATCH_MAX_SIZE, settings.MICROBATCH_MAX_WAIT_MS)
+        return self._embed_batcher
+
+    @property
+    def rerank_batcher(self) -> AsyncMicroBatcher:
+        if self._rerank_batcher is None:
+            self._rerank_batcher = AsyncMicroBatcher(self.reranker.rerank_batch, self.executor, settings.MICROBATCH_MAX_SIZE, settings.MICROBATCH_MAX_WAIT_MS)
+        return self._rerank_batcher
+
+    def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        with telemetry.span('embedding.query', texts=len(queries)):
+            if hasattr(self.embeddings, 'embed_queries'):
+                return self.embeddings.embed_queries(queries)
+            return [self.embeddings.embed_query(query) for query in queries]
+
+    def _scope(self, filters: Dict[str, object]=None, tenants: Iterable[str]=None):
+        filters = {**self.filters, **(filters or {})}
+        tenants = list(tenants) if tenants else self.tenants
+        for field in set(unindexed_fields(filters)) - self._warned_fields:
+            self._warned_fields.add(field)
+            echo(f"⚠️ Filtro sobre '{field}' sin índice de payload; añádelo a PAYLOAD_INDEX_EXTRA para evitar escaneos completos.")
+        return (self._child_filter(filters, tenants), route_collections(tenants))
+
+    def _child_filter(self, filters: Dict[str, object]=None, tenants: Iterable[str]=None) -> models.Filter:
+        return models.Filter(must=[models.FieldCondition(key='type', match=models.MatchValue(value='child'))] + build_conditions(filters, tenants))
+
+    def _search_request(self, query: str, query_vector: List[float], k: int, query_filter: models.Filter=None, collection: str=None) -> dict:
+        query_filter = query_filter or self._child_filter()
+        collection = collection or self.collection
+        request = {'collection_name': collection, 'with_vectors': False}
+        if self.hybrid:
+            prefetch_limit = k * settings.HYBRID_PREFETCH_FACTOR
+            dense = models.Prefetch(query=query_vector, using=settings.DENSE_VECTOR_NAME, filter=query_filter, params=self.search_params, limit=prefetch_limit)
+            sparse = models.Prefetch(query=self.sparse_encoder.encode_query(query), using=settings.SPARSE_VECTOR_NAME, filter=query_filter, limit=prefetch_limit)
+            request.update(prefetch=[dense, sparse], query=models.FusionQuery(fusion=models.Fusion.RRF))
+            fetch_k = k * settings.HYBRID_FETCH_K_FACTOR
+        else:
+            request.update(query=query_vector, query_filter=query_filter, search_params=self.search_params)
+            fetch_k = k * settings.FETCH_K_FACTOR
+        if self.mode == 'grouped':
+            request.update(group_by='parent_id', limit=k * settings.PARENT_CANDIDATES_FACTOR, group_size=1, with_payload=False)
+            if self.parent_store is None:
+                request['with_lookup'] = models.WithLookup(collection=collection, with_payload=True, with_vectors=False)
+        else:
+            request.update(limit=fetch_k, with_payload=CHILD_PAYLOAD_FIELDS)
+        return request
+
+    def _parse_hits(self, result):
+        parent_scores = {}
+        looked_up = {}
+        if self.mode == 'grouped':
+            for group in result.groups:
+                parent_scores[str(group.id)] = group.hits[0].score
+                if group.lookup is not None:
+                    looked_up[str(group.id)] = Document(page_content=group.lookup.payload.get('page_content', ''), metadata=group.lookup.payload)
+        else:
+            for hit in result.points:
                 p_id = hit.payload.get('parent_id')
-                if p_id:
-                    parent_ids.add(p_id)
-            if not parent_ids:
+                if p_id and p_id not in parent_scores:
+                    parent_scores[p_id] = hit.score
+            telemetry.incr('candidates_fetched', len(result.points))
+            telemetry.incr('parents_deduped', len(result.points) - len(parent_scores))
+        return (parent_scores, looked_up)
+
+    def _handle_error(self, e: Exception):
+        if any((marker in str(e) for marker in CONNECTION_ERROR_MARKERS)):
+            echo(f'❌ Error crítico de DB: {e}')
+            raise VectorDBConnectionError('No se pudo conectar a Qdrant.')
+        echo(f'❌ Error inesperado en retrieval: {e}')
+        raise e
+
+    def _points_to_docs(self, points) -> Dict[str, Document]:
+        return {str(point.id): Document(page_content=point.payload.get('page_content', ''), metadata=point.payload) for point in points}
+
+    def _resolve_local(self, parent_ids: List[str], looked_up: Dict[str, Document]):
+        docs = dict(looked_up)
+        docs.update(self.parent_cache.get_many([p_id for p_id in parent_ids if p_id not in docs]))
+        missing = [p_id for p_id in parent_ids if p_id not in docs]
+        if missing and self.parent_store is not None:
+            stored = {d.metadata.get('doc_id'): d for d in self.parent_store.get_many(missing)}
+            docs.update(stored)
+            missing = [p_id for p_id in missing if p_id not in stored]
+        return (docs, missing)
+
+    def _candidates(self, parent_scores: Dict[str, float], docs: Dict[str, Document]) -> List[Document]:
+        return [Document(page_content=docs[p_id].page_content, metadata={**docs[p_id].metadata, 'retrieval_score': score, 'retrieval_fused': self.hybrid}) for p_id, score in parent_scores.items() if p_id in docs]
+
+    def _build_candidates(self, parent_scores: Dict[str, float], docs: Dict[str, Document]) -> List[Document]:
+        self.parent_cache.put_many(docs)
+        return self._candidates(parent_scores, docs)
+
+    def _missing_by_collection(self, missing: List[str], origins: Dict[str, str]=None) -> Dict[str, List[str]]:
+        by_collection = {}
+        for p_id in missing:
+            by_collection.setdefault((origins or {}).get(p_id, self.collection), []).append(p_id)
+        return by_collection
+
+    def _load_parents(self, parent_ids: List[str], looked_up: Dict[str, Document], origins: Dict[str, str]=None) -> Dict[str, Document]:
+        docs, missing = self._resolve_local(parent_ids, looked_up)
+        if missing:
+            with telemetry.span('qdrant.retrieve', ids=len(missing)):
+                for collection, ids in self._missing_by_collection(missing, origins).items():
+                    docs.update(self._points_to_docs(self.client.retrieve(collection_name=collection, ids=ids, with_vectors=False)))
+        return docs
+
+    def _fetch_parents(self, parent_scores: Dict[str, float], looked_up: Dict[str, Document], origins: Dict[str, str]=None) -> List[Document]:
+        with telemetry.span('parents.fetch', parents=len(parent_scores)):
+            return self._build_candidates(parent_scores, self._load_parents(list(parent_scores), looked_up, origins))
+
+    async def _afetch_parents(self, parent_scores: Dict[str, float], looked_up: Dict[str, Document], origins: Dict[str, str]=None) -> List[Document]:
+        with telemetry.span('parents.fetch', parents=len(parent_scores)):
+            if self.parent_store is not None:
+                docs, missing = await self._run_in_executor(self._resolve_local, list(parent_scores), looked_up)
+            else:
+                docs, missing = self._resolve_local(list(parent_scores), looked_up)
+            if missing:
+                with telemetry.span('qdrant.retrieve', ids=len(missing)):
+                    batches = await asyncio.gather(*(self.async_client.retrieve(collection_name=collection, ids=ids, with_vectors=False) for collection, ids in self._missing_by_collection(missing, origins).items()))
+                    for points in batches:
+                        docs.update(self._points_to_docs(points))
+            return self._build_candidates(parent_scores, docs)
+
+    async def _run_in_executor(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+
+    def _query(self, query: str, query_vector: List[float], k: int, query_filter: models.Filter=None, collection: str=None):
+        request = self._search_request(query, query_vector, k, query_filter, collection)
+        with telemetry.span('qdrant.query_points', mode=self.mode, collection=request['collection_name']):
+            if self.mode == 'grouped':
+                return self.client.query_points_groups(**request)
+            return self.client.query_points(**request)
+
+    async def _aquery(self, query: str, query_vector: List[float], k: int, query_filter: models.Filter=None, collection: str=None):
+        request = self._search_request(query, query_vector, k, query_filter, collection)
+        with telemetry.span('qdrant.query_points', mode=self.mode, collection=request['collection_name']):
+            if self.mode == 'grouped':
+                return await self.async_client.query_points_groups(**request)
+            return await self.async_client.query_points(**request)
+
+    def _merge_hits(self, collections: List[str], results) -> tuple:
+        parent_scores, looked_up, origins = ({}, {}, {})
+        for collection, (scores, lookups) in zip(collections, results):
+            looked_up.update(lookups)
+            for p_id, score in scores.items():
+                if score > parent_scores.get(p_id, float('-inf')):
+                    parent_scores[p_id] = score
+                    origins[p_id] = collection
+        limit = max((len(scores) for scores, _ in results), default=0)
+        ranked = sorted(parent_scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        telemetry.incr('fanout_candidates_dropped', len(parent_scores) - len(ranked))
+        return (dict(ranked), looked_up, origins)
+
+    def _search_hits(self, query: str, query_vector: List[float], k: int, query_filter: models.Filter, collections: List[str]) -> tuple:
+        if len(collections) == 1:
+            return (*self._parse_hits(self._query(query, query_vector, k, query_filter, collections[0])), None)
+        with telemetry.span('qdrant.fanout', collections=len(collections)):
+            results = list(self.fanout_executor.map(lambda collection: self._parse_hits(self._query(query, query_vector, k, query_filter, collection)), collections))
+        return self._merge_hits(collections, results)
+
+    async def _asearch_hits(self, query: str, query_vector: List[float], k: int, query_filter: models.Filter, collections: List[str]) -> tuple:
+        if len(collections) == 1:
+            return (*self._parse_hits(await self._aquery(query, query_vector, k, query_filter, collections[0])), None)
+        with telemetry.span('qdrant.fanout', collections=len(collections)):
+            results = await asyncio.gather(*(self._aquery(query, query_vector, k, query_filter, collection) for collection in collections))
+        return self._merge_hits(collections, [self._parse_hits(result) for result in results])
+
+    def _batch_request(self, request: dict) -> models.QueryRequest:
+        return models.QueryRequest(prefetch=request.get('prefetch'), query=request['query'], filter=request.get('query_filter'), params=request.get('search_params'), limit=request['limit'], with_payload=request['with_payload'], with_vector=False)
+
+    def _query_batch(self, queries: List[str], query_vectors: List[List[float]], k: int, query_filter: models.Filter, collection: str):
+        if self.mode == 'grouped':
+            return [self._query(query, vector, k, query_filter, collection) for query, vector in zip(queries, query_vectors)]
+        requests = [self._batch_request(self._search_request(query, vector, k, query_filter, collection)) for query, vector in zip(queries, query_vectors)]
+        with telemetry.span('qdrant.query_batch_points', queries=len(requests), collection=collection):
+            return self.client.query_batch_points(collection_name=collection, requests=requests)
+
+    def _search_hits_batch(self, queries: List[str], query_vectors: List[List[float]], k: int, query_filter: models.Filter, collections: List[str]) -> List[tuple]:
+        if len(collections) == 1:
+            return [(*self._parse_hits(result), None) for result in self._query_batch(queries, query_vectors, k, query_filter, collections[0])]
+        with telemetry.span('qdrant.fanout', collections=len(collections), queries=len(queries)):
+            per_collection = list(self.fanout_executor.map(lambda collection: [self._parse_hits(result) for result in self._query_batch(queries, query_vectors, k, query_filter, collection)], collections))
+        return [self._merge_hits(collections, list(results)) for results in zip(*per_collection)]
+
+    def search_batch(self, queries: List[str], k: int=5, filters: Dict[str, object]=None, tenants: Iterable[str]=None) -> List[List[Document]]:
+        if not queries:
+            return []
+        try:
+            query_filter, collections = self._scope(filters, tenants)
+            query_vectors = self.embed_queries(list(queries))
+            hits = self._search_hits_batch(queries, query_vectors, k, query_filter, collections)
+            parent_ids = list(dict.fromkeys((p_id for parent_scores, _, _ in hits for p_id in parent_scores)))
+            looked_up = {p_id: doc for _, lookups, _ in hits for p_id, doc in lookups.items()}
+            origins = {p_id: collection for _, _, batch_origins in hits for p_id, collection in (batch_origins or {}).items()}
+            with telemetry.span('parents.fetch', parents=len(parent_ids), queries=len(queries)):
+                docs = self._load_parents(parent_ids, looked_up, origins)
+                self.parent_cache.put_many(docs)
+            telemetry.incr('parents_shared_in_batch', sum((len(parent_scores) for parent_scores, _, _ in hits)) - len(parent_ids))
+            requests = [(query, self._candidates(parent_scores, docs), k) for query, (parent_scores, _, _) in zip(queries, hits)]
+            active = [i for i, (_, candidates, _) in enumerate(requests) if candidates]
+            results = [[] for _ in queries]
+            for i, ranked in zip(active, self.reranker.rerank_batch([requests[i] for i in active])):
+                results[i] = ranked
+            return results
+        except Exception as e:
+            self._handle_error(e)
+
+    def iter_search_batches(self, queries: Iterable[str], k: int=5, batch_size: int=None, filters: Dict[str, object]=None, tenants: Iterable[str]=None) -> Iterator[Tuple[str, List[Document]]]:
+        batch_size = batch_size or settings.SEARCH_BATCH_SIZE
+        iterator = iter(queries)
+        while (batch := list(islice(iterator, batch_size))):
+            start = time.perf_counter()
+            results = self.search_batch(batch, k=k, filters=filters, tenants=tenants)
+            elapsed = time.perf_counter() - start
+            echo(f'📦 Lote de {len(batch)} consultas en {elapsed:.2f} s ({len(batch) / elapsed:.1f} consultas/s).')
+            yield from zip(batch, results)
+
+    def search(self, query: str, k: int=5, filters: Dict[str, object]=None, tenants: Iterable[str]=None) -> List[Document]:
+        try:
+            query_filter, collections = self._scope(filters, tenants)
+            echo(f"🔍 Vector Search (Broad, modo {self.mode}{(' híbrido' if self.hybrid else '')}{(f', {len(collections)} colecciones' if len(collections) > 1 else '')}): '{query}'...")
+            with telemetry.span('embedding.query', texts=1):
+                query_vector = self.embeddings.embed_query(query)
+            parent_scores, looked_up, origins = self._search_hits(query, query_vector, k, query_filter, collections)
+            if not parent_scores:
                 return []
-            parent_points = self.client.retrieve(collection_name=self.collection, ids=list(parent_ids))
-            candidate_docs = [Document(page_content=point.payload.get('page_content', ''), metadata=point.payload) for point in parent_points]
-            print(f'📊 Candidatos únicos recuperados: {len(candidate_docs)}')
-            print('⚖️ Ejecutando Reranking...')
+            candidate_docs = self._fetch_parents(parent_scores, looked_up, origins)
+            echo(f'📊 Candidatos únicos recuperados: {len(candidate_docs)}')
+            echo('⚖️ Ejecutando Reranking...')
             reranked_docs = self.reranker.rerank_documents(query, candidate_docs, top_n=k)
             return reranked_docs
         except Exception as e:
-            if 'Connection refused' in str(e) or 'Cannot connect' in str(e):
-                print(f'❌ Error crítico de DB: {e}')
-                raise VectorDBConnectionError('No se pudo conectar a Qdrant.')
-            else:
-                print(f'❌ Error inesperado en retrieval: {e}')
-                raise e
\ No newline at end of file
+            self._handle_error(e)
+
+    async def asearch(self, query: str, k: int=5, filters: Dict[str, object]=None, tenants: Iterable[str]=None) -> List[Document]:
+        try:
+            query_filter, collections = self._scope(filters, tenants)
+            query_vector = await self.embed_batcher.submit(query)
+            parent_scores, looked_up, origins = await self._asearch_hits(query, query_vector, k, query_filter, collections)
+            if not parent_scores:
+                return []
+            candidate_docs = await self._afetch_parents(parent_scores, looked_up, origins)
+            return await self.rerank_batcher.submit((query, candidate_docs, k))
+        except Exception as e:
+            self._handle_error(e)
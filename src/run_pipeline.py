@@ -1,4 +1,6 @@
 import subprocess
+import argparse
+import runpy
 import sys
 import time
 import os
@@ -35,7 +37,43 @@ def run_step(script_path, description):
         print(f"\n❌ ERROR CRÍTICO: {e}")
         return False
 
+def run_step_in_process(script_path, description):
+    print(f"\n{'='*60}")
+    print(f"🚀 INICIANDO (en proceso): {description}")
+    print(f"{'='*60}")
+
+    start_time = time.time()
+    # Cada script ve su propio argv, como si se lanzara por separado
+    saved_argv = sys.argv
+    sys.argv = [script_path]
+    try:
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"\n❌ ERROR: Falló {description}")
+            print(f"Exit code: {e.code}")
+            return False
+    except Exception as e:
+        print(f"\n❌ ERROR CRÍTICO: {e}")
+        return False
+    finally:
+        sys.argv = saved_argv
+    duration = time.time() - start_time
+    print(f"\n✅ ÉXITO: {description} completado en {duration:.2f}s")
+    return True
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Orquestador del pipeline de MediRAG.")
+    parser.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Ejecuta todos los pasos en este intérprete, reutilizando modelos y clientes ya cargados.",
+    )
+    parser.add_argument("--no-warmup", action="store_true", help="No precalienta los recursos en modo en proceso.")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     base_dir = os.path.dirname(os.path.abspath(__file__))
     
     # Definimos la secuencia de pasos del pipeline
@@ -71,17 +109,32 @@ def main():
     ]
 
     print("🤖 INICIANDO ORQUESTACIÓN DEL PIPELINE DE MEDIRAG")
+
+    registry = None
+    if args.in_process:
+        # Los recursos (embeddings, reranker, clientes Qdrant) se cargan una sola vez para todos los pasos
+        if base_dir not in sys.path:
+            sys.path.insert(0, base_dir)
+        from core.resources import registry
+        if not args.no_warmup:
+            registry.warmup()
     
     for step in steps:
         if not os.path.exists(step["path"]):
             print(f"⚠️ Archivo no encontrado: {step['path']}")
             sys.exit(1)
             
-        success = run_step(step["path"], step["desc"])
+        if args.in_process:
+            success = run_step_in_process(step["path"], step["desc"])
+        else:
+            success = run_step(step["path"], step["desc"])
         if not success:
             print("\n🛑 Deteniendo pipeline por fallo en etapa previa.")
             sys.exit(1)
 
+    if registry is not None:
+        registry.report()
+
     print(f"\n{'='*60}")
     print("🎉 PIPELINE COMPLETADO EXITOSAMENTE")
     print(f"{'='*60}")
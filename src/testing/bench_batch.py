@@ -0,0 +1,82 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging, telemetry
+from vector_store.docstore import ParentDocStore
+from vector_store.store import VectorDBService
+from retrieval.services import MedicalRetriever
+from testing.bench_rerank import build_service
+from ingestion.splitters import MedicalTextSplitter
+from testing.fakes import HashingEmbeddings, LatencyClient
+from testing.regression import build_pages, build_queries
+
+STAGES = ('embedding.query', 'qdrant.query_points', 'qdrant.query_batch_points', 'parents.fetch', 'rerank')
+
+def build_retriever(client, parent_store: ParentDocStore, args) -> MedicalRetriever:
+    embeddings = HashingEmbeddings(seconds_per_call=args.embed_call_ms / 1000, seconds_per_text=args.embed_text_ms / 1000)
+    reranker = build_service(args.reranker, args.rerank_call_ms, cache=True, prune_margin=settings.RERANK_PRUNE_MARGIN, truncate=True)
+    return MedicalRetriever(client=LatencyClient(client, args.qdrant_ms / 1000), embeddings=embeddings, reranker=reranker, parent_store=parent_store)
+
+def main():
+    parser = argparse.ArgumentParser(description='Throughput (consultas/s) del bucle secuencial de search() frente a search_batch() con query_batch_points, retrieve deduplicado y rerank por lotes.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=256)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=None)
+    parser.add_argument('--url', default=None, help='Qdrant real (p.ej. http://localhost:6333); por defecto, en memoria.')
+    parser.add_argument('--qdrant-ms', type=float, default=5.0, help='Latencia de red simulada por llamada a Qdrant.')
+    parser.add_argument('--embed-call-ms', type=float, default=10.0, help='Coste fijo simulado por llamada al modelo de embeddings.')
+    parser.add_argument('--embed-text-ms', type=float, default=0.5, help='Coste simulado por texto embebido.')
+    parser.add_argument('--rerank-call-ms', type=float, default=5.0, help='Coste fijo simulado por llamada al cross-encoder.')
+    parser.add_argument('--reranker', default=settings.RERANKER_MODEL, choices=list(settings.RERANKER_MODEL_COSTS_MS), help='Modelo cuyo coste por token se simula.')
+    parser.add_argument('--output', default=None, help='Escribe también los resultados por lotes en este JSONL.')
+    args = parser.parse_args()
+    chunks = MedicalTextSplitter().split_documents(build_pages(args.pages))
+    labelled = build_queries(chunks, args.queries)
+    queries = [query for query, _ in labelled]
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        client = QdrantClient(url=args.url) if args.url else QdrantClient(':memory:')
+        if args.url and client.collection_exists(settings.COLLECTION_NAME):
+            client.delete_collection(settings.COLLECTION_NAME)
+        VectorDBService(client=client, embeddings=HashingEmbeddings(), parent_store=parent_store).upload_documents([Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks], wait=True)
+        retriever = build_retriever(client, parent_store, args)
+        telemetry.reset()
+        start = time.perf_counter()
+        sequential = [retriever.search(query, k=args.k) for query in queries]
+        sequential_seconds = time.perf_counter() - start
+        sequential_calls = retriever.client.calls
+        sequential_stages = telemetry.snapshot()['stages']
+        retriever = build_retriever(client, parent_store, args)
+        telemetry.reset()
+        start = time.perf_counter()
+        batched = []
+        out = open(args.output, 'w', encoding='utf-8') if args.output else None
+        for query, docs in retriever.iter_search_batches(queries, k=args.k, batch_size=args.batch_size):
+            batched.append(docs)
+            if out:
+                out.write(json.dumps({'query': query, 'results': [d.metadata.get('doc_id') for d in docs]}, ensure_ascii=False) + '\n')
+        if out:
+            out.close()
+        batched_seconds = time.perf_counter() - start
+        batched_calls = retriever.client.calls
+        batched_stages = telemetry.snapshot()['stages']
+        if args.url:
+            client.delete_collection(settings.COLLECTION_NAME)
+    same = sum((1 for a, b in zip(sequential, batched) if [d.metadata.get('doc_id') for d in a] == [d.metadata.get('doc_id') for d in b]))
+    hits = [sum((1 for docs, (_, parent_id) in zip(results, labelled) if parent_id in [d.metadata.get('doc_id') for d in docs])) / len(labelled) for results in (sequential, batched)]
+    print(f'\n--- 📊 Búsqueda masiva ({len(queries)} consultas, k={args.k}, lote={args.batch_size or settings.SEARCH_BATCH_SIZE}) ---')
+    for label, seconds, calls, recall, stages in (('secuencial', sequential_seconds, sequential_calls, hits[0], sequential_stages), ('search_batch', batched_seconds, batched_calls, hits[1], batched_stages)):
+        print(f'{label:<14} {len(queries) / seconds:>8.1f} consultas/s | total={seconds:>7.2f} s | llamadas a Qdrant={calls:>5} | recall@{args.k}={recall:.3f}')
+        print('               ' + ' | '.join((f"{name}={stage['total_seconds']:.2f} s/{stage['count']}" for name, stage in stages.items() if name in STAGES)))
+    if not args.url:
+        print('ℹ️ Qdrant en memoria evalúa los filtros en Python consulta a consulta (query_batch_points es un bucle local): ese coste no se amortiza aquí, solo los viajes de red, las llamadas al modelo y el rerank.')
+    print(f'Aceleración: x{sequential_seconds / batched_seconds:.1f} | rankings idénticos: {same}/{len(queries)}')
+if __name__ == '__main__':
+    configure_logging()
+    main()
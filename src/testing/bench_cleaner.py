@@ -0,0 +1,64 @@
+import os
+import re
+import time
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import pypdf
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from ingestion.cleaners import MedicalTextCleaner
+from ingestion.parallel import discover_pdfs
+from ingestion.splitters import MedicalTextSplitter
+from testing.fakes import write_synthetic_pdf
+
+def legacy_clean(text: str) -> str:
+    text = re.sub('\\s+', ' ', text).strip()
+    text = re.sub('\\[\\d+\\]', '', text)
+    text = re.sub('http\\S+', '', text)
+    text = text.replace('•', '')
+    return text
+
+def extract_raw_pages(pages: int):
+    sources = discover_pdfs(settings.RAW_DATA_DIR) if os.path.isdir(settings.RAW_DATA_DIR) else []
+    with tempfile.TemporaryDirectory() as tmp:
+        if not sources:
+            print('📚 Sin PDFs en data/raw: extrayendo páginas de un PDF sintético.')
+            sources = [os.path.join(tmp, 'synthetic.pdf')]
+            write_synthetic_pdf(sources[0], pages)
+        return [page.extract_text() or '' for source in sources for page in pypdf.PdfReader(source).pages]
+
+def chars_per_second(fn, texts, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(texts)
+    return sum(map(len, texts)) * rounds / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='Micro-benchmark de MedicalTextCleaner (chars/s) sobre páginas extraídas de PDFs reales.')
+    parser.add_argument('--pages', type=int, default=300, help='Páginas del PDF sintético si no hay PDFs en data/raw.')
+    parser.add_argument('--rounds', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=settings.PDF_WORKERS)
+    args = parser.parse_args()
+    texts = extract_raw_pages(args.pages)
+    flat = MedicalTextCleaner(preserve_paragraphs=False)
+    paragraphs = MedicalTextCleaner(preserve_paragraphs=True)
+    batches = [texts[i:i + 32] for i in range(0, len(texts), 32)]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        pooled = lambda _: list(pool.map(paragraphs.clean_batch, batches))
+        pooled(None)
+        cases = [('legacy (4 pasadas re.sub)', lambda ts: [legacy_clean(t) for t in ts]), ('precompilado (plano)', flat.clean_batch), ('precompilado (párrafos)', paragraphs.clean_batch), (f'clean_batch en pool x{args.workers}', pooled)]
+        results = [(label, chars_per_second(fn, texts, args.rounds)) for label, fn in cases]
+    splitter = MedicalTextSplitter()
+    chunk_counts = {}
+    for label, clean in (('legacy', legacy_clean), ('párrafos', paragraphs.clean)):
+        docs = [Document(page_content=clean(t), metadata={'source': 'bench.pdf', 'page': i + 1}) for i, t in enumerate(texts)]
+        chunk_counts[label] = len(splitter.split_documents(docs))
+    print(f'\n--- 📊 Limpieza de {len(texts)} páginas ({sum(map(len, texts)) / 1000000.0:.2f} M chars) ---')
+    for label, rate in results:
+        print(f'{label:<30} {rate / 1000000.0:>8.2f} M chars/s')
+    print(f"Chunks generados: legacy={chunk_counts['legacy']} | párrafos={chunk_counts['párrafos']}")
+if __name__ == '__main__':
+    configure_logging()
+    main()
@@ -0,0 +1,42 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from retrieval.services import MedicalRetriever
+from generation.context_packing import ContextPacker
+from testing.fakes import HashingEmbeddings, LexicalReranker, build_synthetic_corpus
+from testing.load_test_chat import QUERIES, populate
+
+def legacy_context(docs) -> str:
+    return '\n\n'.join((f"[Fuente: {d.metadata.get('source')} (Pág {d.metadata.get('page')})]: {d.page_content.replace(chr(10), ' ')}" for d in docs))
+
+def main():
+    parser = argparse.ArgumentParser(description='Tokens de contexto por petición: concatenación legacy vs empaquetado con presupuesto y deduplicación.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--k', type=int, default=6)
+    parser.add_argument('--budget', type=int, default=settings.CONTEXT_TOKEN_BUDGET)
+    parser.add_argument('--duplicate-ratio', type=float, default=0.3, help='Fracción de páginas que citan un párrafo de otra página.')
+    args = parser.parse_args()
+    chunks = build_synthetic_corpus(args.pages, duplicate_ratio=args.duplicate_ratio)
+    packer = ContextPacker(token_budget=args.budget)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        retriever = MedicalRetriever(client=populate(chunks, HashingEmbeddings(), parent_store), embeddings=HashingEmbeddings(), reranker=LexicalReranker(), parent_store=parent_store)
+        for query in QUERIES:
+            docs = retriever.search(query, k=args.k)
+            start = time.perf_counter()
+            packed = packer.pack(docs)
+            rows.append((packer.count_tokens(legacy_context(docs)), packed['context_tokens'], packed['merged'], packed['dropped_sentences'], time.perf_counter() - start))
+    legacy, packed, merged, dropped, seconds = map(np.asarray, zip(*rows))
+    print(f'\n--- 📊 Contexto para {len(QUERIES)} consultas (k={args.k}, presupuesto={args.budget} tokens) ---')
+    print(f'legacy       tokens/petición media={legacy.mean():>7.0f} | máx={legacy.max():>6.0f}')
+    print(f'empaquetado  tokens/petición media={packed.mean():>7.0f} | máx={packed.max():>6.0f} | padres fusionados={merged.sum()} | frases duplicadas eliminadas={dropped.sum()} | {seconds.mean() * 1000:.2f} ms/petición')
+    print(f'Reducción de tokens de prompt: {(1 - packed.sum() / legacy.sum()) * 100:.1f}%')
+if __name__ == '__main__':
+    configure_logging()
+    main()
@@ -0,0 +1,94 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+from collections import Counter
+import numpy as np
+from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from ingestion.loaders import PDFLoader
+from ingestion.splitters import MedicalTextSplitter
+from ingestion.parallel import discover_pdfs
+from vector_store.docstore import ParentDocStore
+from vector_store.sparse import sparse_tokenize
+from vector_store.store import VectorDBService
+from retrieval.services import MedicalRetriever
+from testing.fakes import HashingEmbeddings, PassthroughReranker, WORDS
+CODES = ['IL-6', 'J12.82', 'BRCA1', 'U07.1', 'remdesivir', 'tocilizumab', 'ACE2', 'TMPRSS2', 'G93.3', 'dexametasona', 'HLA-B27', 'ferritina']
+
+def load_corpus(pages: int):
+    sources = discover_pdfs(settings.RAW_DATA_DIR) if os.path.isdir(settings.RAW_DATA_DIR) else []
+    if sources:
+        print(f'📚 Corpus de muestra: {len(sources)} PDFs de {settings.RAW_DATA_DIR}')
+        loader = PDFLoader()
+        docs = [page for source in sources for page in loader.load(source)]
+    else:
+        print('📚 Sin PDFs en data/raw: usando corpus sintético con términos exactos (códigos, fármacos, genes).')
+        rng = random.Random(0)
+        docs = []
+        for page in range(pages):
+            sentences = [' '.join((rng.choice(WORDS) for _ in range(12))) + f' {rng.choice(CODES)}-{rng.randint(1, 400)}' for _ in range(12)]
+            docs.append(Document(page_content='. '.join(sentences), metadata={'source': f'synthetic_{page // 10}.pdf', 'page': page % 10 + 1}))
+    return MedicalTextSplitter().split_documents(docs)
+
+def build_queries(chunks, n: int, terms: int=4):
+    children = [c for c in chunks if c.metadata['type'] == 'child']
+    df = Counter((t for c in children for t in set(sparse_tokenize(c.page_content))))
+    rng = random.Random(1)
+    queries = []
+    for child in rng.sample(children, min(n, len(children))):
+        tokens = sorted(set(sparse_tokenize(child.page_content)), key=lambda t: (df[t], t))
+        queries.append((' '.join(tokens[:terms]), child.metadata['parent_id']))
+    return queries
+
+def evaluate(retriever: MedicalRetriever, queries, k: int):
+    hits_at_k, reciprocal_ranks, candidates, latencies = ([], [], [], [])
+    for query, parent_id in queries:
+        start = time.perf_counter()
+        docs = retriever.search(query, k=k)
+        latencies.append(time.perf_counter() - start)
+        ranked = [d.metadata.get('doc_id') for d in sorted(docs, key=lambda d: d.metadata['retrieval_score'], reverse=True)]
+        candidates.append(len(ranked))
+        rank = ranked.index(parent_id) + 1 if parent_id in ranked else None
+        hits_at_k.append(rank is not None and rank <= k)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    return {'recall@k': np.mean(hits_at_k), 'mrr': np.mean(reciprocal_ranks), 'candidates': np.mean(candidates), 'p50_ms': np.percentile(latencies, 50) * 1000}
+
+def main():
+    parser = argparse.ArgumentParser(description='Recall@k y latencia: búsqueda densa vs híbrida (denso + BM25 con RRF).')
+    parser.add_argument('--embeddings', choices=['real', 'fake'], default='real')
+    parser.add_argument('--pages', type=int, default=200, help='Páginas del corpus sintético (si no hay PDFs).')
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('-k', type=int, default=4)
+    args = parser.parse_args()
+    if args.embeddings == 'real':
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    else:
+        embeddings = HashingEmbeddings()
+    chunks = load_corpus(args.pages)
+    queries = build_queries(chunks, args.queries)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        for hybrid in (False, True):
+            settings.HYBRID_SEARCH = hybrid
+            client = QdrantClient(':memory:')
+            VectorDBService(client=client, embeddings=embeddings, parent_store=parent_store).upload_documents([Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks])
+            factors = (4, 2, 1) if not hybrid else (2, 1)
+            for factor in factors:
+                if hybrid:
+                    settings.HYBRID_FETCH_K_FACTOR = factor
+                else:
+                    settings.FETCH_K_FACTOR = factor
+                retriever = MedicalRetriever(client=client, embeddings=embeddings, reranker=PassthroughReranker(keep_all=True), parent_store=parent_store, mode='standard', hybrid=hybrid)
+                results.append((f"{('híbrido RRF' if hybrid else 'denso')} fetch_k={factor}k", evaluate(retriever, queries, args.k)))
+    print(f'\n--- 📊 Recall de candidatos padre ({len(queries)} consultas, k={args.k}) ---')
+    for label, r in results:
+        print(f"{label:<24} recall@k={r['recall@k']:.3f} | MRR={r['mrr']:.3f} | candidatos a rerank={r['candidates']:.1f} | p50={r['p50_ms']:.1f} ms")
+if __name__ == '__main__':
+    configure_logging()
+    main()
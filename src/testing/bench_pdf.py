@@ -0,0 +1,51 @@
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from core.config import settings
+from core.telemetry import configure_logging
+from ingestion.loaders import PDFLoader
+from ingestion.page_cache import PageTextCache
+from testing.fakes import write_synthetic_pdf
+
+def timed(fn):
+    start = time.perf_counter()
+    pages = fn()
+    return (pages, time.perf_counter() - start)
+
+def peak_memory(fn) -> float:
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 1024 ** 2
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de PDF: serie vs rangos de páginas en paralelo vs caché de texto.')
+    parser.add_argument('--pdf', default=None, help='PDF a medir (por defecto se genera uno sintético).')
+    parser.add_argument('--pages', type=int, default=500, help='Páginas del PDF sintético.')
+    parser.add_argument('--workers', type=int, default=settings.PDF_WORKERS)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = args.pdf
+        if pdf_path is None:
+            pdf_path = os.path.join(tmp, 'synthetic_guideline.pdf')
+            write_synthetic_pdf(pdf_path, args.pages)
+        settings.PAGE_CACHE_ENABLED = False
+        serial = PDFLoader(workers=1)
+        parallel = PDFLoader(workers=args.workers)
+        cached = PDFLoader(workers=args.workers, page_cache=PageTextCache(os.path.join(tmp, 'pages.sqlite3')))
+        cases = [('serie (legacy)', lambda: len(serial.load(pdf_path))), (f'rangos en paralelo x{args.workers}', lambda: len(parallel.load(pdf_path))), ('caché fría (extrae + guarda)', lambda: len(cached.load(pdf_path))), ('caché caliente (sin pypdf)', lambda: len(cached.load(pdf_path)))]
+        results = [(label, *timed(fn)) for label, fn in cases]
+        list_peak = peak_memory(lambda: serial.load(pdf_path))
+        stream_peak = peak_memory(lambda: sum((1 for _ in serial.iter_load(pdf_path))))
+    print(f'\n--- 📊 Extracción de {os.path.basename(pdf_path)} ---')
+    for label, pages, seconds in results:
+        print(f'{label:<32} {pages:>5} páginas | {seconds:>7.2f} s | {pages / seconds:>8.1f} páginas/s')
+    if (os.cpu_count() or 1) < args.workers:
+        print(f'ℹ️ Solo hay {os.cpu_count()} núcleos: los rangos en paralelo no pueden acelerar la extracción en esta máquina.')
+    print(f'Pico de memoria (serie): load()={list_peak:.1f} MB | iter_load()={stream_peak:.1f} MB')
+if __name__ == '__main__':
+    configure_logging()
+    main()
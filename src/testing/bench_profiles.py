@@ -0,0 +1,95 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient, models
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from vector_store.profiles import estimate_memory, get_profile, search_params
+from vector_store.store import VectorDBService
+from testing.fakes import HashingEmbeddings, build_synthetic_corpus
+
+def simulate_recall(profile: dict, vectors: np.ndarray, queries: np.ndarray, k: int) -> float:
+    if not profile['quantization']:
+        return 1.0
+    if profile['quantization'] == 'int8':
+        lo, hi = np.quantile(vectors, [0.005, 0.995])
+        codes = np.round((np.clip(vectors, lo, hi) - lo) / (hi - lo) * 255)
+        approx = queries @ (codes * (hi - lo) / 255 + lo).T
+    else:
+        approx = np.sign(queries) @ np.sign(vectors).T
+    exact = queries @ vectors.T
+    candidates = np.argsort(-approx, axis=1)[:, :int(k * profile.get('oversampling', 1.0))]
+    hits = 0
+    for row, cand in enumerate(candidates):
+        rescored = cand[np.argsort(-exact[row, cand])[:k]] if settings.QUANTIZATION_RESCORE else cand[:k]
+        hits += len(set(rescored) & set(np.argsort(-exact[row])[:k]))
+    return hits / (len(queries) * k)
+
+def measure_search(client: QdrantClient, profile: dict, query_vectors, k: int):
+    child_filter = models.Filter(must=[models.FieldCondition(key='type', match=models.MatchValue(value='child'))])
+    params = search_params(profile)
+    latencies, hits = ([], 0)
+    for vector in query_vectors:
+        start = time.perf_counter()
+        approx = client.query_points(settings.COLLECTION_NAME, query=vector, query_filter=child_filter, search_params=params, limit=k, with_payload=False)
+        latencies.append(time.perf_counter() - start)
+        exact = client.query_points(settings.COLLECTION_NAME, query=vector, query_filter=child_filter, search_params=models.SearchParams(exact=True), limit=k, with_payload=False)
+        hits += len({p.id for p in approx.points} & {p.id for p in exact.points})
+    return (np.percentile(np.asarray(latencies) * 1000, 50), hits / (len(query_vectors) * k))
+
+def main():
+    parser = argparse.ArgumentParser(description='Memoria, tiempo de ingesta y recall/latencia por perfil de colección.')
+    parser.add_argument('--url', default=None, help='Qdrant real (p.ej. http://localhost:6333). Sin URL se usa Qdrant en memoria y se simula la cuantización.')
+    parser.add_argument('--profiles', nargs='+', default=list(settings.COLLECTION_PROFILES))
+    parser.add_argument('--embeddings', choices=['real', 'fake'], default='real')
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--scale', type=int, default=5000000, help='Nº de vectores para la estimación de memoria.')
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+    if args.embeddings == 'real':
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    else:
+        print('⚠️ Embeddings fake (hashing, no negativos): el recall de la cuantización binaria no es representativo.')
+        embeddings = HashingEmbeddings()
+    chunks = build_synthetic_corpus(args.pages)
+    children = [c for c in chunks if c.metadata['type'] == 'child']
+    vectors = np.asarray(embeddings.embed_documents([c.page_content for c in children]), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(children), size=min(args.queries, len(children)), replace=False)
+    query_vectors = np.asarray(embeddings.embed_documents([children[i].page_content.split('. ')[0] for i in sample]), dtype=np.float32)
+    base_collection = settings.COLLECTION_NAME
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.profiles:
+            profile = get_profile(name)
+            settings.COLLECTION_NAME = f'{base_collection}_bench_{name}'
+            client = QdrantClient(url=args.url) if args.url else QdrantClient(':memory:')
+            if client.collection_exists(settings.COLLECTION_NAME):
+                client.delete_collection(settings.COLLECTION_NAME)
+            service = VectorDBService(client=client, embeddings=embeddings, parent_store=ParentDocStore(os.path.join(tmp, f'{name}.sqlite3')), profile=name)
+            start = time.perf_counter()
+            with service.bulk_indexing():
+                service.upload_documents([Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks], wait=True)
+            ingest_seconds = time.perf_counter() - start
+            p50, recall = measure_search(client, profile, query_vectors.tolist(), args.k)
+            if not args.url:
+                recall = simulate_recall(profile, vectors, query_vectors, args.k)
+            memory = estimate_memory(profile, args.scale)
+            results.append((name, memory, ingest_seconds, p50, recall))
+            client.delete_collection(settings.COLLECTION_NAME)
+    settings.COLLECTION_NAME = base_collection
+    print(f'\n--- 📊 Perfiles de colección ({len(children)} hijos indexados, k={args.k}) ---')
+    if not args.url:
+        print('ℹ️ Qdrant en memoria hace búsqueda exacta: la latencia no refleja HNSW/cuantización y el recall se simula con numpy (oversampling + rescoring).')
+    print(f"{'perfil':<8} {f'RAM@{args.scale / 1000000.0:g}M':>10} {'disco':>9} {'ingesta':>9} {'p50':>9} {f'recall@{args.k}':>10}")
+    for name, memory, ingest_seconds, p50, recall in results:
+        print(f"{name:<8} {memory['ram_bytes'] / 1024 ** 3:>8.2f}GB {memory['disk_bytes'] / 1024 ** 3:>7.2f}GB {ingest_seconds:>8.2f}s {p50:>6.2f} ms {recall:>10.3f}")
+if __name__ == '__main__':
+    configure_logging()
+    main()
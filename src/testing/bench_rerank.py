@@ -0,0 +1,64 @@
+import time
+import random
+import argparse
+import numpy as np
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from retrieval.reranking import RerankerService, select_reranker_model
+from testing.fakes import HashingEmbeddings, SimulatedCrossEncoder, WORDS, build_synthetic_corpus
+
+def build_workload(pages: int, distinct: int, total: int, candidates: int):
+    parents = [c for c in build_synthetic_corpus(pages) if c.metadata['type'] == 'parent']
+    embeddings = HashingEmbeddings()
+    parent_vectors = np.asarray(embeddings.embed_documents([p.page_content for p in parents]))
+    rng = random.Random(0)
+    pool = [' '.join(rng.sample(WORDS, 4)) for _ in range(distinct)]
+    requests = {}
+    for query in pool:
+        scores = parent_vectors @ np.asarray(embeddings.embed_query(query))
+        top = np.argsort(-scores)[:candidates]
+        requests[query] = [Document(page_content=parents[i].page_content, metadata={**parents[i].metadata, 'retrieval_score': float(scores[i])}) for i in top]
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return [(query, requests[query]) for query in rng.choices(pool, weights=weights, k=total)]
+
+def build_service(model_name: str, ms_per_call: float, cache: bool, prune_margin: float, truncate: bool) -> RerankerService:
+    seconds_per_token = settings.RERANKER_MODEL_COSTS_MS[model_name] / settings.RERANK_MAX_LENGTH / 1000
+    service = RerankerService(model_name=model_name, ranker=SimulatedCrossEncoder(settings.RERANK_MAX_LENGTH, seconds_per_token, ms_per_call / 1000), cache_size=None if cache else 0, prune_margin=prune_margin)
+    if not truncate:
+        service.max_chars = None
+    return service
+
+def run(service: RerankerService, workload, k: int, batch: int):
+    start = time.perf_counter()
+    for i in range(0, len(workload), batch):
+        service.rerank_batch([(query, docs, k) for query, docs in workload[i:i + batch]])
+    return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark offline del reranker: caché de scores, poda, truncado, batch multi-consulta y modelo por presupuesto.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--distinct', type=int, default=40, help='Consultas distintas (la carga sigue una distribución Zipf).')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--candidates', type=int, default=16)
+    parser.add_argument('--ms-per-call', type=float, default=2.0, help='Overhead simulado por invocación del modelo.')
+    parser.add_argument('--budget-ms', type=float, default=50.0, help='Presupuesto de latencia por consulta para elegir modelo.')
+    parser.add_argument('--prune-margin', type=float, default=settings.RERANK_PRUNE_MARGIN, help='Margen de poda sobre retrieval_score (los embeddings fake dan scores muy juntos).')
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+    workload = build_workload(args.pages, args.distinct, args.queries, args.candidates)
+    default_model = settings.RERANKER_MODEL
+    budget_model = select_reranker_model(args.budget_ms, args.candidates)
+    margin = args.prune_margin
+    cases = [('legacy (sin caché/poda/truncado)', default_model, False, 0, False, 1), ('+ truncado + poda', default_model, False, margin, True, 1), ('+ caché de scores', default_model, True, margin, True, 1), ('+ batch multi-consulta x8', default_model, True, margin, True, 8), (f'modelo por presupuesto ({args.budget_ms:g} ms)', budget_model, True, margin, True, 8)]
+    results = []
+    for label, model_name, cache, prune_margin, truncate, batch in cases:
+        service = build_service(model_name, args.ms_per_call, cache, prune_margin, truncate)
+        wall = run(service, workload, args.k, batch)
+        results.append((label, service.stats(), service.ranker.session.calls, wall))
+    print(f'\n--- 📊 Reranking ({args.queries} consultas, {args.candidates} candidatos, top {args.k}) ---')
+    for label, stats, model_calls, wall in results:
+        print(f"{label:<36} {stats['model']:<26} p50/llamada={stats['p50_ms']:>7.1f} ms | q/s={args.queries / wall:>7.1f} | pares={stats['pairs_scored']:>5} | podados={stats['pruned']:>4} | caché={stats['cache_hit_rate']:.0%} | invocaciones={model_calls}")
+if __name__ == '__main__':
+    configure_logging()
+    main()
@@ -0,0 +1,70 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient, models
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from retrieval.services import MedicalRetriever
+from testing.fakes import HashingEmbeddings, LatencyClient, PassthroughReranker, build_synthetic_corpus
+QUERIES = ['síntomas neurológicos del COVID', 'dosis del fármaco en el ensayo clínico', 'riesgo de mortalidad hospitalaria', 'anosmia y cefalea en pacientes', 'diagnóstico por imagen pulmonar', 'miocarditis tras la vacuna', 'fatiga persistente', 'encefalitis e ictus']
+
+def populate(chunks, embeddings) -> QdrantClient:
+    client = QdrantClient(':memory:')
+    client.create_collection(settings.COLLECTION_NAME, vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE))
+    vectors = embeddings.embed_documents([c.page_content for c in chunks])
+    points = [models.PointStruct(id=c.metadata['doc_id'], vector=v, payload={**c.metadata, 'page_content': c.page_content}) for c, v in zip(chunks, vectors)]
+    for i in range(0, len(points), 256):
+        client.upsert(settings.COLLECTION_NAME, points=points[i:i + 256])
+    return client
+
+def legacy_search(client, embeddings, query: str, k: int):
+    query_vector = embeddings.embed_query(query)
+    result = client.query_points(collection_name=settings.COLLECTION_NAME, query=query_vector, query_filter=models.Filter(must=[models.FieldCondition(key='type', match=models.MatchValue(value='child'))]), limit=k * 4)
+    parent_ids = list({hit.payload.get('parent_id') for hit in result.points if hit.payload.get('parent_id')})
+    return client.retrieve(collection_name=settings.COLLECTION_NAME, ids=parent_ids)
+
+def measure(fn, rounds: int):
+    latencies = []
+    for _ in range(rounds):
+        for query in QUERIES:
+            start = time.perf_counter()
+            fn(query)
+            latencies.append(time.perf_counter() - start)
+    latencies = np.asarray(latencies) * 1000
+    return (np.percentile(latencies, 50), np.percentile(latencies, 95))
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia por búsqueda del retriever (antes/después) contra Qdrant en memoria.')
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--rtt-ms', type=float, default=5.0, help='Latencia de red simulada por llamada a Qdrant.')
+    parser.add_argument('-k', type=int, default=4)
+    args = parser.parse_args()
+    settings.PARENT_STORE = 'qdrant'
+    embeddings = HashingEmbeddings()
+    chunks = build_synthetic_corpus(args.pages)
+    raw_client = populate(chunks, embeddings)
+    client = LatencyClient(raw_client, args.rtt_ms / 1000)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        docstore = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        docstore.put_many([c for c in chunks if c.metadata['type'] == 'parent'])
+        results.append(('legacy (payload completo + retrieve)', measure(lambda q: legacy_search(client, embeddings, q, args.k), args.rounds)))
+        cases = [('standard + proyección', 'standard', None, 0), ('grouped + lookup', 'grouped', None, 0), ('grouped + lookup + caché', 'grouped', None, settings.PARENT_CACHE_SIZE), ('standard + docstore + caché', 'standard', docstore, settings.PARENT_CACHE_SIZE), ('grouped + docstore + caché', 'grouped', docstore, settings.PARENT_CACHE_SIZE)]
+        for label, mode, parent_store, cache_size in cases:
+            retriever = MedicalRetriever(client=client, embeddings=embeddings, reranker=PassthroughReranker(), parent_store=parent_store, mode=mode)
+            retriever.parent_cache.max_size = cache_size
+            calls_before = client.calls
+            p50, p95 = measure(lambda q: retriever.search(q, k=args.k), args.rounds)
+            calls = (client.calls - calls_before) / (args.rounds * len(QUERIES))
+            results.append((f'{label} ({calls:.1f} llamadas/búsqueda)', (p50, p95)))
+    print('\n--- 📊 Latencia por búsqueda (sin reranking) ---')
+    print('ℹ️ El modo local de qdrant-client agrupa en Python: el coste de grouped aquí sobrestima el de un servidor real; compara sobre todo las llamadas por búsqueda.')
+    for label, (p50, p95) in results:
+        print(f'{label:<55} p50={p50:>7.2f} ms | p95={p95:>7.2f} ms')
+if __name__ == '__main__':
+    configure_logging()
+    main()
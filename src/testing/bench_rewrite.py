@@ -0,0 +1,53 @@
+import os
+import argparse
+import tempfile
+import numpy as np
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from retrieval.services import MedicalRetriever
+from generation.rag_chain import MedicalChatBot
+from testing.fakes import HashingEmbeddings, LatencyClient, LatencyFakeChatModel, LexicalReranker, RewriteFakeChatModel, build_synthetic_corpus
+from testing.load_test_chat import populate
+CONVERSATION = [('¿Cuáles son los síntomas neurológicos del COVID?', None), ('¿Y cómo se tratan?', '¿Cómo se tratan los síntomas neurológicos del COVID?'), ('¿Qué dosis del fármaco se usó en el ensayo clínico de miocarditis?', None), ('¿Ese ensayo incluyó pacientes con anosmia?', '¿El ensayo clínico de miocarditis incluyó pacientes con anosmia?'), ('Riesgo de mortalidad hospitalaria en pacientes con ictus', None), ('¿Y en los vacunados?', 'Riesgo de mortalidad hospitalaria en pacientes con ictus vacunados'), ('Diagnóstico por imagen pulmonar en covid', None), ('¿Qué fatiga produce la encefalitis por covid en ese paciente?', '¿Qué fatiga produce la encefalitis por covid en el paciente?')]
+
+def run_conversation(bot: MedicalChatBot):
+    chat_history = []
+    latencies = []
+    for query, _ in CONVERSATION:
+        for event, payload in bot.stream_answer(query, chat_history):
+            if event == 'done':
+                done = payload
+        latencies.append(done['total_seconds'])
+        chat_history = (chat_history + [(query, done['response'])])[-3:]
+    return latencies
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia por turno de la reescritura con historial: siempre vs heurística vs especulativa.')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--rewrite-ms', type=float, default=250.0, help='Latencia simulada del modelo de reescritura.')
+    parser.add_argument('--llm-ms', type=float, default=300.0, help='Latencia simulada del modelo de respuesta.')
+    parser.add_argument('--qdrant-ms', type=float, default=40.0, help='Latencia de red simulada por llamada a Qdrant.')
+    args = parser.parse_args()
+    settings.SEMANTIC_CACHE_ENABLED = False
+    rewrites = {query: rewrite for query, rewrite in CONVERSATION if rewrite}
+    chunks = build_synthetic_corpus(args.pages)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        client = LatencyClient(populate(chunks, HashingEmbeddings(), parent_store), args.qdrant_ms / 1000)
+        retriever = MedicalRetriever(client=client, embeddings=HashingEmbeddings(), reranker=LexicalReranker(), parent_store=parent_store)
+        for mode in ('always', 'heuristic', 'speculative'):
+            llm = LatencyFakeChatModel(responses=['Respuesta sintética de prueba.'], latency=args.llm_ms / 1000)
+            rewrite_llm = RewriteFakeChatModel(responses=[''], rewrites=rewrites, latency=args.rewrite_ms / 1000)
+            bot = MedicalChatBot(retriever, llm=llm, rewrite_llm=rewrite_llm, rewrite_mode=mode)
+            latencies = run_conversation(bot)
+            bot.close()
+            results.append((mode, np.asarray(latencies[1:]) * 1000, bot.rewrite_stats))
+    baseline = results[0][1].mean()
+    print(f'\n--- 📊 Turnos con historial ({len(CONVERSATION) - 1}), reescritura={args.rewrite_ms:.0f} ms ---')
+    for mode, latencies, stats in results:
+        print(f"{mode:<12} media={latencies.mean():>7.1f} ms | p95={np.percentile(latencies, 95):>7.1f} ms | ahorro/turno={baseline - latencies.mean():>6.1f} ms | omitidas={stats['skipped']} reescritas={stats['rewritten']} reutilizadas={stats['speculative_hits']} re-recuperaciones={stats['re_retrievals']}")
+if __name__ == '__main__':
+    configure_logging()
+    main()
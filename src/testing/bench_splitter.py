@@ -0,0 +1,65 @@
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from core.config import settings
+from core.telemetry import configure_logging
+from ingestion.splitters import MedicalTextSplitter, chunk_id, content_hash, load_tokenizer
+from testing.bench_cleaner import extract_raw_pages
+from ingestion.cleaners import MedicalTextCleaner
+
+class LegacyMedicalTextSplitter:
+
+    def __init__(self, parent_chunk_size=2000, child_chunk_size=400):
+        self.parent_splitter = RecursiveCharacterTextSplitter(chunk_size=parent_chunk_size, chunk_overlap=200, separators=['\n\n', '\n', '.', ' ', ''])
+        self.child_splitter = RecursiveCharacterTextSplitter(chunk_size=child_chunk_size, chunk_overlap=50)
+
+    def split_documents(self, docs):
+        all_chunks = []
+        for doc in docs:
+            source = doc.metadata.get('source', '')
+            page = doc.metadata.get('page', '')
+            for p_idx, parent in enumerate(self.parent_splitter.split_documents([doc])):
+                parent_hash = content_hash(parent.page_content)
+                parent_id = chunk_id(source, page, p_idx, parent_hash)
+                parent.metadata.update(doc_id=parent_id, content_hash=parent_hash, type='parent')
+                all_chunks.append(parent)
+                for c_idx, child in enumerate(self.child_splitter.split_documents([parent])):
+                    child_hash = content_hash(child.page_content)
+                    child.metadata.update(parent_id=parent_id, doc_id=chunk_id(parent_id, c_idx, child_hash), content_hash=child_hash, type='child')
+                    all_chunks.append(child)
+        return all_chunks
+
+def measure(splitter, docs, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        chunks = splitter.split_documents(docs)
+    seconds = (time.perf_counter() - start) / rounds
+    tracemalloc.start()
+    chunks = splitter.split_documents(docs)
+    peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+    tracemalloc.stop()
+    return (chunks, seconds, peak)
+
+def main():
+    parser = argparse.ArgumentParser(description='Splitter legacy (RecursiveCharacterTextSplitter x2) vs splitter por tokens en una sola pasada.')
+    parser.add_argument('--pages', type=int, default=300)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+    cleaner = MedicalTextCleaner()
+    docs = [Document(page_content=cleaner.clean(text), metadata={'source': 'bench.pdf', 'page': i + 1}) for i, text in enumerate(extract_raw_pages(args.pages))]
+    tokenizer = load_tokenizer()
+    results = []
+    for label, splitter in (('legacy (caracteres, 2 pasadas)', LegacyMedicalTextSplitter()), ('tokens + offsets (1 pasada)', MedicalTextSplitter(tokenizer=tokenizer))):
+        chunks, seconds, peak = measure(splitter, docs, args.rounds)
+        child_tokens = np.asarray([len(tokenizer.token_offsets(c.page_content)) for c in chunks if c.metadata['type'] == 'child'])
+        results.append((label, len(chunks), seconds, peak, child_tokens))
+    print(f'\n--- 📊 Splitting de {len(docs)} páginas ({type(tokenizer).__name__}) ---')
+    for label, n_chunks, seconds, peak, child_tokens in results:
+        over = int((child_tokens > settings.EMBEDDING_MAX_TOKENS - 2).sum())
+        print(f'{label:<32} {n_chunks:>6} chunks | {n_chunks / seconds:>9.0f} chunks/s | {len(docs) / seconds:>7.0f} páginas/s | pico {peak:>6.1f} MB | tokens/hijo p50={np.percentile(child_tokens, 50):.0f} p95={np.percentile(child_tokens, 95):.0f} | >{settings.EMBEDDING_MAX_TOKENS - 2} tokens: {over}')
+if __name__ == '__main__':
+    configure_logging()
+    main()
\ No newline at end of file
@@ -0,0 +1,77 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from vector_store.store import VectorDBService
+from retrieval.services import MedicalRetriever
+from testing.fakes import HashingEmbeddings, LatencyClient, LexicalReranker, build_synthetic_corpus
+from testing.load_test_chat import QUERIES
+
+def tenant_of(doc: Document, tenants: int) -> str:
+    return f"dept{int(doc.metadata['source'].split('_')[1].split('.')[0]) % tenants}"
+
+def ingest(client, chunks, tenants: int, parent_store: ParentDocStore):
+    for t in range(tenants):
+        docs = [Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks if tenant_of(c, tenants) == f'dept{t}']
+        VectorDBService(client=client, embeddings=HashingEmbeddings(), parent_store=parent_store, tenant=f'dept{t}').upload_documents(docs, wait=True)
+
+def timed(fn, queries):
+    latencies, results = ([], [])
+    for query in queries:
+        start = time.perf_counter()
+        results.append(fn(query))
+        latencies.append(time.perf_counter() - start)
+    return (np.asarray(latencies) * 1000, results)
+
+def main():
+    parser = argparse.ArgumentParser(description='Búsqueda filtrada por tenant/fuente con índices de payload vs post-filtrado, y fan-out paralelo entre colecciones por tenant.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--tenants', type=int, default=4)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--qdrant-ms', type=float, default=20.0, help='Latencia de red simulada por llamada a Qdrant.')
+    args = parser.parse_args()
+    chunks = build_synthetic_corpus(args.pages)
+    queries = QUERIES * 3
+    target = 'dept0'
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        settings.TENANT_ROUTING = 'payload'
+        client = QdrantClient(':memory:')
+        ingest(client, chunks, args.tenants, parent_store)
+        retriever = MedicalRetriever(client=LatencyClient(client, args.qdrant_ms / 1000), embeddings=HashingEmbeddings(), reranker=LexicalReranker(), parent_store=parent_store)
+        latencies, results = timed(lambda q: retriever.search(q, k=args.k, tenants=[target]), queries)
+        rows.append(('filtro payload', latencies, results, target))
+        latencies, results = timed(lambda q: [d for d in retriever.search(q, k=args.k) if d.metadata.get(settings.TENANT_FIELD) == target], queries)
+        rows.append(('post-filtrado', latencies, results, target))
+        source = chunks[0].metadata['source']
+        latencies, results = timed(lambda q: retriever.search(q, k=args.k, filters={'source': source, 'page': {'gte': 2, 'lte': 5}}), queries)
+        assert all((d.metadata['source'] == source and 2 <= d.metadata['page'] <= 5 for docs in results for d in docs))
+        rows.append(('fuente+páginas', latencies, results, None))
+        everyone = [f'dept{t}' for t in range(args.tenants)]
+        latencies, results = timed(lambda q: retriever.search(q, k=args.k, tenants=everyone), queries)
+        rows.append((f'payload x{args.tenants}', latencies, results, None))
+        settings.TENANT_ROUTING = 'collection'
+        sharded = QdrantClient(':memory:')
+        ingest(sharded, chunks, args.tenants, parent_store)
+        for label, workers in (('fan-out secuencial', 1), ('fan-out paralelo', args.tenants)):
+            settings.TENANT_FANOUT_WORKERS = workers
+            retriever = MedicalRetriever(client=LatencyClient(sharded, args.qdrant_ms / 1000), embeddings=HashingEmbeddings(), reranker=LexicalReranker(), parent_store=parent_store)
+            latencies, results = timed(lambda q: retriever.search(q, k=args.k, tenants=everyone), queries)
+            rows.append((label, latencies, results, None))
+        settings.TENANT_ROUTING = 'payload'
+    print(f'\n--- 📊 Búsqueda con alcance ({len(chunks)} chunks, {args.tenants} tenants, k={args.k}, red={args.qdrant_ms:.0f} ms) ---')
+    print('ℹ️ Qdrant en memoria recorre todos los puntos: la latencia del filtro no refleja los índices de payload, pero sí la pérdida de resultados del post-filtrado.')
+    for label, latencies, results, tenant in rows:
+        leaked = sum((1 for docs in results for d in docs if tenant and d.metadata.get(settings.TENANT_FIELD) != tenant))
+        short = sum((1 for docs in results if len(docs) < args.k))
+        print(f'{label:<20} p50={np.percentile(latencies, 50):>7.1f} ms | p95={np.percentile(latencies, 95):>7.1f} ms | resultados/consulta={np.mean([len(r) for r in results]):>4.2f} | consultas con <k={short:>3} | fugas={leaked}')
+if __name__ == '__main__':
+    configure_logging()
+    main()
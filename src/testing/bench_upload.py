@@ -0,0 +1,53 @@
+import time
+import random
+import argparse
+from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.store import VectorDBService
+from testing.fakes import HashingEmbeddings, LatencyClient
+WORDS = 'paciente covid neurológico síntomas tratamiento ensayo clínico dosis fármaco gen proteína riesgo mortalidad hospital diagnóstico imagen pulmonar cefalea anosmia encefalitis'.split()
+
+def make_docs(n: int):
+    rng = random.Random(0)
+    docs = []
+    for i in range(n):
+        text = ' '.join((rng.choice(WORDS) for _ in range(60)))
+        docs.append(Document(page_content=text, metadata={'doc_id': f'00000000-0000-0000-0000-{i:012d}', 'type': 'child', 'source': 'bench.pdf', 'page': i // 10}))
+    return docs
+
+def run_case(docs, embeddings, latency_s, embed_batch, upsert_batch, parallelism, wait):
+    client = LatencyClient(QdrantClient(':memory:'), latency_s, methods=('upsert',))
+    service = VectorDBService(client=client, embeddings=embeddings)
+    start = time.perf_counter()
+    service.upload_documents(docs, batch_size=embed_batch, upsert_batch_size=upsert_batch, parallelism=parallelism, wait=wait)
+    elapsed = time.perf_counter() - start
+    assert client.count(settings.COLLECTION_NAME).count == len(docs)
+    return len(docs) / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de VectorDBService.upload_documents contra Qdrant en memoria.')
+    parser.add_argument('--docs', type=int, default=4096)
+    parser.add_argument('--embeddings', choices=['fake', 'real'], default='fake')
+    parser.add_argument('--ms-per-text', type=float, default=0.5, help='Coste simulado de inferencia por texto (solo embeddings fake).')
+    parser.add_argument('--latency-ms', type=float, default=20.0, help='Latencia de red simulada por upsert.')
+    args = parser.parse_args()
+    if args.embeddings == 'real':
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    else:
+        embeddings = HashingEmbeddings(seconds_per_text=args.ms_per_text / 1000)
+    cases = [(64, 64, 0, True), (64, 64, 1, True), (64, 256, 2, True), (64, 256, 2, False), (128, 256, 4, False), (32, 512, 4, False)]
+    results = []
+    for embed_batch, upsert_batch, parallelism, wait in cases:
+        rate = run_case(make_docs(args.docs), embeddings, args.latency_ms / 1000, embed_batch, upsert_batch, parallelism, wait)
+        results.append((embed_batch, upsert_batch, parallelism, wait, rate))
+    print('\n--- 📊 Throughput de carga (vectores/s) ---')
+    print(f"{'embed':>6} {'upsert':>7} {'hilos':>6} {'wait':>6} {'vec/s':>10}")
+    for embed_batch, upsert_batch, parallelism, wait, rate in results:
+        mode = 'lockstep' if parallelism == 0 else str(parallelism)
+        print(f'{embed_batch:>6} {upsert_batch:>7} {mode:>6} {str(wait):>6} {rate:>10.1f}')
+if __name__ == '__main__':
+    configure_logging()
+    main()
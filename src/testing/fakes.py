@@ -0,0 +1,246 @@
+import re
+import time
+import random
+import zlib
+import asyncio
+from typing import AsyncIterator, Iterator, List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from core.config import settings
+from ingestion.splitters import MedicalTextSplitter
+NETWORK_METHODS = ('upsert', 'query_points', 'query_points_groups', 'query_batch_points', 'retrieve', 'delete', 'scroll')
+_TOKEN_RE = re.compile('\\w+', re.UNICODE)
+WORDS = 'paciente covid neurológico síntomas tratamiento ensayo clínico dosis fármaco gen proteína riesgo mortalidad hospital diagnóstico imagen pulmonar cefalea anosmia encefalitis ictus miocarditis fatiga vacuna'.split()
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+def build_synthetic_corpus(pages: int, seed: int=0, duplicate_ratio: float=0.0) -> List[Document]:
+    rng = random.Random(seed)
+    docs = []
+    for page in range(pages):
+        paragraphs = ['. '.join((' '.join((rng.choice(WORDS) for _ in range(14))) for _ in range(5))) for _ in range(4)]
+        if docs and rng.random() < duplicate_ratio:
+            paragraphs[rng.randrange(4)] = rng.choice(docs).page_content.split('\n\n')[rng.randrange(4)]
+        docs.append(Document(page_content='\n\n'.join(paragraphs), metadata={'source': f'synthetic_{page // 10}.pdf', 'page': page % 10 + 1}))
+    return MedicalTextSplitter().split_documents(docs)
+
+def write_synthetic_pdf(path: str, pages: int, lines_per_page: int=40, seed: int=0):
+    rng = random.Random(seed)
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for _ in range(pages):
+        lines = [' '.join((rng.choice(WORDS) for _ in range(10))) for _ in range(lines_per_page)]
+        stream = 'BT /F1 9 Tf 40 800 Td 11 TL ' + ' '.join((f'({line}) Tj T*' for line in lines)) + ' ET'
+        stream = stream.encode('latin-1', errors='replace')
+        objects.append(b'<< /Length %d >>\nstream\n%s\nendstream' % (len(stream), stream))
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (len(objects),))
+        kids.append(len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join((b'%d 0 R' % k for k in kids)), pages)
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    out += b''.join((b'%010d 00000 n \n' % offset for offset in offsets))
+    out += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+class HashingEmbeddings(Embeddings):
+
+    def __init__(self, dim: int=None, seconds_per_text: float=0.0, seconds_per_call: float=0.0):
+        self.dim = dim or settings.VECTOR_SIZE
+        self.seconds_per_text = seconds_per_text
+        self.seconds_per_call = seconds_per_call
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in tokenize(text):
+            vector[zlib.crc32(token.encode('utf-8')) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.seconds_per_text or self.seconds_per_call:
+            time.sleep(self.seconds_per_call + self.seconds_per_text * len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+class LexicalReranker:
+
+    def __init__(self, seconds_per_passage: float=0.0):
+        self.seconds_per_passage = seconds_per_passage
+
+    def rerank_documents(self, query: str, docs: List[Document], top_n: int=5) -> List[Document]:
+        if self.seconds_per_passage:
+            time.sleep(self.seconds_per_passage * len(docs))
+        terms = set(tokenize(query))
+        scored = []
+        for doc in docs:
+            tokens = tokenize(doc.page_content)
+            score = sum((1 for t in tokens if t in terms)) / (len(tokens) or 1)
+            scored.append(Document(page_content=doc.page_content, metadata={**doc.metadata, 'rerank_score': score}))
+        scored.sort(key=lambda d: d.metadata['rerank_score'], reverse=True)
+        return scored[:top_n]
+
+    def rerank_batch(self, requests: List[Tuple[str, List[Document], int]]) -> List[List[Document]]:
+        return [self.rerank_documents(query, docs, top_n=top_n) for query, docs, top_n in requests]
+
+class PassthroughReranker:
+
+    def __init__(self, keep_all: bool=False):
+        self.keep_all = keep_all
+
+    def rerank_documents(self, query: str, docs: List[Document], top_n: int=5) -> List[Document]:
+        return list(docs) if self.keep_all else docs[:top_n]
+
+    def rerank_batch(self, requests: List[Tuple[str, List[Document], int]]) -> List[List[Document]]:
+        return [self.rerank_documents(query, docs, top_n=top_n) for query, docs, top_n in requests]
+
+class _Encoding:
+
+    def __init__(self, ids: List[int], type_ids: List[int]):
+        self.ids = ids
+        self.type_ids = type_ids
+        self.attention_mask = [1] * len(ids)
+
+class SimulatedCrossEncoderTokenizer:
+
+    def __init__(self, max_length: int=512):
+        self.max_length = max_length
+
+    def encode_batch(self, pairs: List[List[str]]) -> List[_Encoding]:
+        encoded = []
+        for query, passage in pairs:
+            q_ids = [zlib.crc32(t.encode('utf-8')) % 30000 for t in tokenize(query)]
+            p_ids = [zlib.crc32(t.encode('utf-8')) % 30000 for t in tokenize(passage)][:max(self.max_length - len(q_ids) - 3, 0)]
+            encoded.append(_Encoding([101] + q_ids + [102] + p_ids + [102], [0] * (len(q_ids) + 2) + [1] * (len(p_ids) + 1)))
+        width = max((len(e.ids) for e in encoded), default=0)
+        for e in encoded:
+            pad = width - len(e.ids)
+            e.ids, e.type_ids, e.attention_mask = (e.ids + [0] * pad, e.type_ids + [0] * pad, e.attention_mask + [0] * pad)
+        return encoded
+
+class SimulatedCrossEncoderSession:
+
+    def __init__(self, seconds_per_token: float=0.0, seconds_per_call: float=0.0):
+        self.seconds_per_token = seconds_per_token
+        self.seconds_per_call = seconds_per_call
+        self.calls = 0
+
+    def run(self, output_names, onnx_input: dict):
+        ids = onnx_input['input_ids']
+        self.calls += 1
+        if self.seconds_per_token or self.seconds_per_call:
+            time.sleep(self.seconds_per_call + self.seconds_per_token * ids.size)
+        type_ids = onnx_input.get('token_type_ids', np.zeros_like(ids))
+        logits = []
+        for row, types in zip(ids, type_ids):
+            query = set(row[(types == 0) & (row > 102)].tolist())
+            passage = row[(types == 1) & (row > 102)].tolist()
+            logits.append([sum((1 for t in passage if t in query)) / (len(passage) or 1) * 10 - 2])
+        return [np.asarray(logits, dtype=np.float32)]
+
+class SimulatedCrossEncoder:
+
+    def __init__(self, max_length: int=512, seconds_per_token: float=0.0, seconds_per_call: float=0.0):
+        self.tokenizer = SimulatedCrossEncoderTokenizer(max_length)
+        self.session = SimulatedCrossEncoderSession(seconds_per_token, seconds_per_call)
+
+class LatencyFakeChatModel(FakeListChatModel):
+    latency: float = 0.0
+
+    def _call(self, *args, **kwargs) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        text = FakeListChatModel._call(self, messages, stop=stop)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        yield from super()._stream(messages, stop=stop, **kwargs)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        async for chunk in super()._astream(messages, stop=stop, **kwargs):
+            yield chunk
+
+class RewriteFakeChatModel(LatencyFakeChatModel):
+    rewrites: dict = {}
+
+    def _rewrite(self, messages) -> str:
+        question = messages[-1].content
+        return self.rewrites.get(question, question)
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._rewrite(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._rewrite(messages)))])
+
+class StreamingFakeChatModel(FakeListChatModel):
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+
+    def _tokens(self) -> List[str]:
+        response = self.responses[self.i]
+        self.i = (self.i + 1) % len(self.responses)
+        return re.findall('\\S+\\s*', response)
+
+    def _call(self, *args, **kwargs) -> str:
+        tokens = self._tokens()
+        time.sleep(self.first_token_latency + self.token_latency * len(tokens))
+        return ''.join(tokens)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens()):
+            if i:
+                time.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_latency)
+        for i, token in enumerate(self._tokens()):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+class LatencyClient:
+
+    def __init__(self, client, latency_s: float, methods=NETWORK_METHODS):
+        self._client = client
+        self._latency_s = latency_s
+        self._methods = set(methods)
+        self.calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self._methods:
+            return attr
+
+        def with_latency(*args, **kwargs):
+            self.calls += 1
+            time.sleep(self._latency_s)
+            return attr(*args, **kwargs)
+        return with_latency
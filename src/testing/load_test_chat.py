@@ -0,0 +1,95 @@
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import os
+import numpy as np
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from retrieval.services import MedicalRetriever
+from generation.rag_chain import MedicalChatBot
+from testing.fakes import HashingEmbeddings, LexicalReranker, LatencyFakeChatModel, build_synthetic_corpus
+QUERIES = ['síntomas neurológicos del COVID', '¿Qué dosis del fármaco se usó en el ensayo clínico?', 'riesgo de mortalidad hospitalaria', 'anosmia y cefalea en pacientes', 'diagnóstico por imagen pulmonar', 'miocarditis tras la vacuna']
+
+def populate(chunks, embeddings, parent_store: ParentDocStore):
+    children = [c for c in chunks if c.metadata['type'] == 'child']
+    parent_store.put_many([c for c in chunks if c.metadata['type'] == 'parent'])
+    vectors = embeddings.embed_documents([c.page_content for c in children])
+    points = [models.PointStruct(id=c.metadata['doc_id'], vector=v, payload={**c.metadata, 'page_content': c.page_content}) for c, v in zip(children, vectors)]
+    vectors_config = models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE)
+    client = QdrantClient(':memory:')
+    client.create_collection(settings.COLLECTION_NAME, vectors_config=vectors_config)
+    client.upsert(settings.COLLECTION_NAME, points=points)
+    return client
+
+async def populate_async(chunks, embeddings):
+    children = [c for c in chunks if c.metadata['type'] == 'child']
+    vectors = embeddings.embed_documents([c.page_content for c in children])
+    points = [models.PointStruct(id=c.metadata['doc_id'], vector=v, payload={**c.metadata, 'page_content': c.page_content}) for c, v in zip(children, vectors)]
+    client = AsyncQdrantClient(':memory:')
+    await client.create_collection(settings.COLLECTION_NAME, vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE))
+    await client.upsert(settings.COLLECTION_NAME, points=points)
+    return client
+
+def report(label: str, latencies, wall_seconds: float):
+    latencies = np.asarray(latencies) * 1000
+    print(f'{label:<22} n={len(latencies):>4} | p50={np.percentile(latencies, 50):>8.1f} ms | p95={np.percentile(latencies, 95):>8.1f} ms | QPS={len(latencies) / wall_seconds:>7.2f}')
+
+async def run_users(bot: MedicalChatBot, users: int, requests_per_user: int):
+    latencies = []
+
+    async def user(user_id: int):
+        rng = random.Random(user_id)
+        for _ in range(requests_per_user):
+            start = time.perf_counter()
+            await bot.aanswer(rng.choice(QUERIES))
+            latencies.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    return (latencies, time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test offline de MedicalChatBot (LLM fake + Qdrant en memoria).')
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=10, help='Peticiones por usuario.')
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--llm-latency-ms', type=float, default=300.0)
+    parser.add_argument('--embed-call-ms', type=float, default=8.0)
+    parser.add_argument('--rerank-passage-ms', type=float, default=2.0)
+    args = parser.parse_args()
+    embeddings = HashingEmbeddings(seconds_per_call=args.embed_call_ms / 1000, seconds_per_text=0.0005)
+    chunks = build_synthetic_corpus(args.pages)
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        sync_client = populate(chunks, HashingEmbeddings(), parent_store)
+        async_client = asyncio.run(populate_async(chunks, HashingEmbeddings()))
+        reranker = LexicalReranker(seconds_per_passage=args.rerank_passage_ms / 1000)
+        llm = LatencyFakeChatModel(responses=['Respuesta sintética de prueba.'], latency=args.llm_latency_ms / 1000)
+        print('\n--- 🧪 Baseline síncrono (1 usuario, answer) ---')
+        retriever = MedicalRetriever(client=sync_client, embeddings=embeddings, reranker=reranker, parent_store=parent_store)
+        bot = MedicalChatBot(retriever, llm=llm)
+        latencies = []
+        start = time.perf_counter()
+        for i in range(args.requests):
+            t0 = time.perf_counter()
+            bot.answer(QUERIES[i % len(QUERIES)])
+            latencies.append(time.perf_counter() - t0)
+        sync_wall = time.perf_counter() - start
+        print('\n--- 📊 Resultados ---')
+        report('sync x1', latencies, sync_wall)
+        for users in args.users:
+
+            async def scenario():
+                retriever = MedicalRetriever(client=sync_client, embeddings=embeddings, reranker=reranker, parent_store=parent_store, async_client=async_client)
+                bot = MedicalChatBot(retriever, llm=llm)
+                result = await run_users(bot, users, args.requests)
+                return (result, retriever.embed_batcher.mean_batch_size(), retriever.rerank_batcher.mean_batch_size())
+            (latencies, wall), embed_batch, rerank_batch = asyncio.run(scenario())
+            report(f'async x{users}', latencies, wall)
+            print(f'{"":<22} micro-batch medio: embeddings={embed_batch:.1f}, rerank={rerank_batch:.1f}')
+if __name__ == '__main__':
+    configure_logging()
+    main()
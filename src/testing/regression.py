@@ -0,0 +1,215 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+import warnings
+from collections import Counter
+from contextlib import redirect_stdout
+import numpy as np
+from qdrant_client import QdrantClient
+from langchain_core.documents import Document
+from core.config import settings
+from core.telemetry import configure_logging
+from ingestion.splitters import MedicalTextSplitter
+from vector_store.docstore import ParentDocStore
+from vector_store.sparse import sparse_tokenize
+from vector_store.store import VectorDBService
+from retrieval.reranking import RerankerService
+from retrieval.services import MedicalRetriever
+from generation.rag_chain import MedicalChatBot
+from generation.context_packing import ContextPacker
+from testing.fakes import HashingEmbeddings, LatencyFakeChatModel, SimulatedCrossEncoder, WORDS
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'models')
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+WORKLOAD_KEYS = ('pages', 'queries', 'k', 'reranker', 'tokenizer')
+HARDWARE_KEYS = ('python', 'machine', 'cpus')
+MIN_MEASURE_SECONDS = 0.5
+CODES = ['IL-6', 'J12.82', 'BRCA1', 'U07.1', 'remdesivir', 'tocilizumab', 'ACE2', 'TMPRSS2', 'G93.3', 'dexametasona', 'HLA-B27', 'ferritina']
+PACKING_PROBES = ['Se administró tocilizumab a 2.5 mg/kg cada 12 h.', 'Neumonía vírica (J12.82) con encefalopatía G93.3 al ingreso.', 'COVID-19 confirmado con código U07.1!', 'Se administró tocilizumab a 8 mg/kg cada 12 h.', 'La ferritina bajó de 1.250,5 a 480 ng/mL en 3.5 días?', 'Se administró tocilizumab a 2.5 mg/kg cada 12 h.']
+METRICS = {'split_pages_per_s': ('higher', 'perf', 50.0, 'pages'), 'upload_chunks_per_s': ('higher', 'perf', 150.0, 'chunks'), 'search_p50_ms': ('lower', 'perf', 10.0, None), 'search_p99_ms': ('lower', 'perf', 20.0, None), 'rerank_p50_ms': ('lower', 'perf', 10.0, None), 'rerank_pairs_per_query': ('lower', 'perf', 0.5, None), 'chat_p50_ms': ('lower', 'perf', 10.0, None), 'peak_rss_mb': ('lower', 'perf', 16.0, None), 'recall_at_k': ('higher', 'quality', 0.0, None), 'mrr': ('higher', 'quality', 0.0, None)}
+
+def build_pages(pages: int, seed: int=0):
+    rng = random.Random(seed)
+    docs = []
+    for page in range(pages):
+        paragraphs = ['. '.join((' '.join((rng.choice(WORDS) for _ in range(12))) + f' {rng.choice(CODES)}-{rng.randint(1, 400)}' for _ in range(4))) + '.' for _ in range(3)]
+        docs.append(Document(page_content='\n\n'.join(paragraphs), metadata={'source': f'synthetic_{page // 10}.pdf', 'page': page % 10 + 1}))
+    return docs
+
+def build_queries(chunks, n: int, terms: int=4, seed: int=1):
+    children = [c for c in chunks if c.metadata['type'] == 'child']
+    df = Counter((t for c in children for t in set(sparse_tokenize(c.page_content))))
+    rng = random.Random(seed)
+    queries = []
+    for child in rng.sample(children, min(n, len(children))):
+        tokens = sorted(set(sparse_tokenize(child.page_content)), key=lambda t: (df[t], t))
+        queries.append((' '.join(tokens[:terms]), child.metadata['parent_id']))
+    return queries
+
+def build_reranker():
+    model_dir = os.path.join(MODELS_DIR, settings.RERANKER_MODEL)
+    if os.path.isdir(model_dir) and any((f.endswith('.onnx') for f in os.listdir(model_dir))):
+        from flashrank import Ranker
+        ranker = Ranker(model_name=settings.RERANKER_MODEL, cache_dir=MODELS_DIR, max_length=settings.RERANK_MAX_LENGTH)
+        return (RerankerService(ranker=ranker), f'flashrank:{settings.RERANKER_MODEL}')
+    seconds_per_token = settings.RERANKER_MODEL_COSTS_MS.get(settings.RERANKER_MODEL, 12.0) / settings.RERANK_MAX_LENGTH / 1000
+    ranker = SimulatedCrossEncoder(settings.RERANK_MAX_LENGTH, seconds_per_token)
+    tokenizer_path = os.path.join(model_dir, 'tokenizer.json')
+    backend = 'simulated'
+    if os.path.exists(tokenizer_path):
+        from tokenizers import Tokenizer
+        ranker.tokenizer = Tokenizer.from_file(tokenizer_path)
+        ranker.tokenizer.enable_truncation(max_length=settings.RERANK_MAX_LENGTH)
+        ranker.tokenizer.enable_padding()
+        backend = f'simulated+tokenizer:{settings.RERANKER_MODEL}'
+    print(f'ℹ️ Sin modelo ONNX en {model_dir}: reranker simulado ({backend}).')
+    return (RerankerService(ranker=ranker), backend)
+
+def measure_rate(fn, units: int, min_seconds: float=MIN_MEASURE_SECONDS) -> float:
+    passes = 0
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        while passes == 0 or time.perf_counter() - start < min_seconds:
+            fn()
+            passes += 1
+    return passes * units / (time.perf_counter() - start)
+
+def run_suite(pages: int, num_queries: int, k: int) -> dict:
+    settings.SEMANTIC_CACHE_ENABLED = False
+    splitter = MedicalTextSplitter()
+    docs = build_pages(pages)
+    chunks = splitter.split_documents(docs)
+    split_rate = measure_rate(lambda: splitter.split_documents(docs), pages)
+    queries = build_queries(chunks, num_queries)
+    reranker, backend = build_reranker()
+    embeddings = HashingEmbeddings()
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        client = QdrantClient(':memory:')
+        vector_db = VectorDBService(client=client, embeddings=embeddings, parent_store=parent_store)
+        children = sum((1 for c in chunks if c.metadata['type'] == 'child'))
+        uploads = [Document(page_content=c.page_content, metadata=dict(c.metadata)) for c in chunks]
+        vector_db.upload_documents(uploads)
+        upload_rate = measure_rate(lambda: vector_db.upload_documents(uploads), children)
+        retriever = MedicalRetriever(client=client, embeddings=embeddings, reranker=reranker, parent_store=parent_store)
+        latencies, hits, reciprocal_ranks = ([], [], [])
+        for query, parent_id in queries:
+            start = time.perf_counter()
+            ranked = [d.metadata.get('doc_id') for d in retriever.search(query, k=k)]
+            latencies.append(time.perf_counter() - start)
+            rank = ranked.index(parent_id) + 1 if parent_id in ranked else None
+            hits.append(rank is not None)
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+        rerank_stats = reranker.stats()
+        bot = MedicalChatBot(retriever, llm=LatencyFakeChatModel(responses=['Respuesta sintética de prueba.']))
+        chat_latencies = []
+        for query, _ in queries[:max(1, len(queries) // 4)]:
+            start = time.perf_counter()
+            bot.answer(query)
+            chat_latencies.append(time.perf_counter() - start)
+    metrics = {'split_pages_per_s': split_rate, 'upload_chunks_per_s': upload_rate, 'search_p50_ms': float(np.percentile(latencies, 50) * 1000), 'search_p99_ms': float(np.percentile(latencies, 99) * 1000), 'rerank_p50_ms': rerank_stats['p50_ms'], 'rerank_pairs_per_query': rerank_stats['pairs_scored'] / len(queries), 'chat_p50_ms': float(np.percentile(chat_latencies, 50) * 1000), 'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 'recall_at_k': float(np.mean(hits)), 'mrr': float(np.mean(reciprocal_ranks))}
+    environment = {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(), 'reranker': backend, 'tokenizer': type(splitter.tokenizer).__name__, 'pages': pages, 'chunks': children, 'queries': len(queries), 'k': k}
+    return {'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'environment': environment, 'metrics': metrics}
+
+def run_repeated(pages: int, num_queries: int, k: int, repeats: int) -> dict:
+    runs = []
+    for i in range(repeats):
+        print(f'\n🔁 Repetición {i + 1}/{repeats} de la suite')
+        runs.append(run_suite(pages, num_queries, k))
+    results = runs[-1]
+    results['metrics'] = {name: float(np.median([run['metrics'][name] for run in runs])) for name in results['metrics']}
+    results['environment']['repeats'] = repeats
+    return results
+
+def check_context_packing() -> list:
+    docs = [Document(page_content=' '.join(PACKING_PROBES[:3]), metadata={'source': 'probe.pdf', 'page': 1, 'rerank_score': 1.0}), Document(page_content='\n'.join(PACKING_PROBES[3:]), metadata={'source': 'probe.pdf', 'page': 2, 'rerank_score': 0.9})]
+    context = ContextPacker(token_budget=10000).pack(docs)['context']
+    missing = [probe for probe in PACKING_PROBES if probe not in context]
+    if context.count(PACKING_PROBES[0]) != 1:
+        missing.append(f'duplicado no eliminado: {PACKING_PROBES[0]}')
+    return missing
+
+def compare(results: dict, baseline: dict, threshold: float, quality_tolerance: float, quality_only: bool=False):
+    regressions = []
+    rows = []
+    for name, value in results['metrics'].items():
+        if name not in baseline['metrics']:
+            continue
+        reference = baseline['metrics'][name]
+        direction, kind, floor, units = METRICS[name]
+        if quality_only and kind != 'quality':
+            continue
+        delta = value - reference if direction == 'higher' else reference - value
+        if kind == 'quality':
+            regressed = delta < -quality_tolerance
+        else:
+            if units:
+                count = results['environment'][units]
+                worse = (count / value - count / reference) * 1000 if value > 0 else float('inf')
+            else:
+                worse = -delta
+            regressed = delta < -threshold * abs(reference) and worse > floor
+        change = (value - reference) / reference * 100 if reference else 0.0
+        rows.append((name, reference, value, change, regressed))
+        if regressed:
+            regressions.append(name)
+    return (rows, regressions)
+
+def main():
+    parser = argparse.ArgumentParser(description='Suite offline de rendimiento y calidad de recuperación con baseline JSON (Qdrant en memoria, corpus sintético etiquetado, LLM fake).')
+    parser.add_argument('--pages', type=int, default=150)
+    parser.add_argument('--queries', type=int, default=80)
+    parser.add_argument('--k', type=int, default=4)
+    parser.add_argument('--repeats', type=int, default=3, help='Ejecuciones de la suite; se compara la mediana de cada métrica.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true', help='Guarda los resultados como nuevo baseline en lugar de comparar.')
+    parser.add_argument('--output', default=None, help='Ruta opcional para guardar los resultados de esta ejecución.')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Empeoramiento relativo máximo tolerado en métricas de rendimiento; además debe superar el margen absoluto de METRICS (ms de latencia, o ms de duración de la etapa en los throughputs).')
+    parser.add_argument('--quality-tolerance', type=float, default=0.01, help='Caída absoluta máxima tolerada en recall@k/MRR.')
+    parser.add_argument('--quality-only', action='store_true', help='Compara solo recall@k/MRR; permite usar un baseline generado en otra máquina.')
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', module='qdrant_client')
+    packing_errors = check_context_packing()
+    if packing_errors:
+        print(f"❌ El empaquetado de contexto altera números o códigos: {packing_errors}")
+        sys.exit(1)
+    print('✅ El empaquetado de contexto conserva números y códigos (2.5 mg/kg, J12.82, G93.3, U07.1).')
+    results = run_repeated(args.pages, args.queries, args.k, max(1, args.repeats))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f'\n💾 Baseline guardado en {args.baseline}')
+        for name, value in results['metrics'].items():
+            print(f'{name:<24} {value:>12.3f}')
+        return
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    differs = lambda keys: [f"{key}: {baseline['environment'].get(key)} → {results['environment'].get(key)}" for key in keys if baseline['environment'].get(key) != results['environment'].get(key)]
+    workload = differs(WORKLOAD_KEYS)
+    if workload:
+        print(f"❌ Carga o modelos distintos a los del baseline ({'; '.join(workload)}); ejecuta con los mismos parámetros o usa --update-baseline.")
+        sys.exit(2)
+    hardware = differs(HARDWARE_KEYS)
+    if hardware and (not args.quality_only):
+        print(f"❌ Máquina distinta a la del baseline ({'; '.join(hardware)}): los tiempos absolutos no son comparables. Genera un baseline en esta máquina (--update-baseline --baseline <ruta>) o compara solo calidad con --quality-only.")
+        sys.exit(2)
+    rows, regressions = compare(results, baseline, args.threshold, args.quality_tolerance, quality_only=args.quality_only)
+    print(f"\n--- 📊 Regresión frente a {args.baseline} ({baseline['created']}){(' [solo calidad]' if args.quality_only else '')} ---")
+    for name, reference, value, change, regressed in rows:
+        print(f"{name:<24} baseline={reference:>10.3f} | actual={value:>10.3f} | {change:>+7.1f}% {('❌' if regressed else '✅')}")
+    if regressions:
+        print(f"\n❌ Regresiones por encima del umbral: {', '.join(regressions)}")
+        sys.exit(1)
+    print('\n✅ Sin regresiones.')
+if __name__ == '__main__':
+    configure_logging()
+    main()
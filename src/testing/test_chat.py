@@ -1,6 +1,7 @@
 from generation.rag_chain import MedicalChatBot
 from retrieval.services import MedicalRetriever
 import time
+from core.telemetry import configure_logging
 
 def main():
     print('🏥 Iniciando MediRAG AI (con Memoria)...')
@@ -21,12 +22,18 @@ def main():
             print('🧹 Memoria borrada.')
             continue
         try:
-            answer, sources = bot.answer(query, chat_history)
-            print(f'\n🤖 MediRAG:\n{answer}')
+            print('\n🤖 MediRAG:')
+            for event, payload in bot.stream_answer(query, chat_history):
+                if event == 'token':
+                    print(payload, end='', flush=True)
+                elif event == 'done':
+                    answer = payload['response']
+            print()
             chat_history.append((query, answer))
             if len(chat_history) > 3:
                 chat_history.pop(0)
         except Exception as e:
             print(f'❌ Error: {e}')
 if __name__ == '__main__':
+    configure_logging()
     main()
\ No newline at end of file
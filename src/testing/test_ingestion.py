@@ -4,6 +4,7 @@ import logging
 import time
 from ingestion.loaders import PDFLoader
 from ingestion.cleaners import MedicalTextCleaner
+from core.telemetry import configure_logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', datefmt='%H:%M:%S')
 logger = logging.getLogger(__name__)
 
@@ -44,4 +45,5 @@ def main():
     end_total = time.time()
     logger.info(f'Ejecución total finalizada en {end_total - start_total:.2f} segundos.')
 if __name__ == '__main__':
+    configure_logging()
     main()
\ No newline at end of file
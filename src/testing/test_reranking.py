@@ -1,4 +1,5 @@
 from retrieval.services import MedicalRetriever
+from core.telemetry import configure_logging
 
 def main():
     try:
@@ -17,4 +18,5 @@ def main():
     except Exception as e:
         print(f'Error: {e}')
 if __name__ == '__main__':
+    configure_logging()
     main()
\ No newline at end of file
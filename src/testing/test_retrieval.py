@@ -1,4 +1,5 @@
 from retrieval.services import MedicalRetriever
+from core.telemetry import configure_logging
 
 def main():
     retriever = MedicalRetriever()
@@ -14,4 +15,5 @@ def main():
         print(f'\n[Longitud total del texto: {len(doc.page_content)} caracteres]')
         print('=' * 60)
 if __name__ == '__main__':
+    configure_logging()
     main()
\ No newline at end of file
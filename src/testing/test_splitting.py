@@ -1,6 +1,7 @@
 from ingestion.loaders import PDFLoader
 from ingestion.splitters import MedicalTextSplitter
 import os
+from core.telemetry import configure_logging
 
 def main():
     pdf_path = 'data/raw/sample_medical_paper.pdf'
@@ -9,7 +10,7 @@ def main():
         return
     loader = PDFLoader()
     raw_docs = loader.load(pdf_path)
-    splitter = MedicalTextSplitter(parent_chunk_size=1000, child_chunk_size=200)
+    splitter = MedicalTextSplitter(parent_tokens=256, child_tokens=64)
     chunks = splitter.split_documents(raw_docs)
     parents = [d for d in chunks if d.metadata['type'] == 'parent']
     children = [d for d in chunks if d.metadata['type'] == 'child']
@@ -35,4 +36,5 @@ def main():
     else:
         print('❌ ERROR: Padre no encontrado.')
 if __name__ == '__main__':
+    configure_logging()
     main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+from core.config import settings
+from core.telemetry import configure_logging
+from vector_store.docstore import ParentDocStore
+from retrieval.services import MedicalRetriever
+from generation.rag_chain import MedicalChatBot
+from testing.fakes import HashingEmbeddings, LexicalReranker, StreamingFakeChatModel, build_synthetic_corpus
+from testing.load_test_chat import QUERIES, populate, populate_async
+RESPONSE = 'La anosmia y la cefalea son síntomas neurológicos frecuentes en pacientes con COVID-19; la mayoría se resuelve en semanas, aunque una fracción persiste como fatiga prolongada.'
+
+def summarize(timed_events):
+    timeline = {}
+    for elapsed, event, _ in timed_events:
+        timeline.setdefault(event, elapsed)
+    done = timed_events[-1][2]
+    tokens = ''.join((payload for _, event, payload in timed_events if event == 'token'))
+    assert tokens == done['response'], 'Los tokens emitidos no reconstruyen la respuesta final.'
+    return (timeline, done)
+
+def consume(events, start: float):
+    return summarize([(time.perf_counter() - start, event, payload) for event, payload in events])
+
+async def aconsume(events, start: float):
+    return summarize([(time.perf_counter() - start, event, payload) async for event, payload in events])
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba offline de stream_answer/astream_answer con un chat model fake en streaming.')
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--first-token-ms', type=float, default=400.0)
+    parser.add_argument('--token-ms', type=float, default=30.0)
+    args = parser.parse_args()
+    settings.SEMANTIC_CACHE_ENABLED = False
+    chunks = build_synthetic_corpus(args.pages)
+    with tempfile.TemporaryDirectory() as tmp:
+        parent_store = ParentDocStore(os.path.join(tmp, 'parents.sqlite3'))
+        client = populate(chunks, HashingEmbeddings(), parent_store)
+        async_client = asyncio.run(populate_async(chunks, HashingEmbeddings()))
+        llm = StreamingFakeChatModel(responses=[RESPONSE], first_token_latency=args.first_token_ms / 1000, token_latency=args.token_ms / 1000)
+        retriever = MedicalRetriever(client=client, embeddings=HashingEmbeddings(), reranker=LexicalReranker(), parent_store=parent_store, async_client=async_client)
+        bot = MedicalChatBot(retriever, llm=llm)
+        query = QUERIES[0]
+        start = time.perf_counter()
+        response, sources = bot.answer(query)
+        blocking = time.perf_counter() - start
+        assert response == RESPONSE and sources
+        start = time.perf_counter()
+        timeline, done = consume(bot.stream_answer(query), start)
+        assert done['sources'], 'stream_answer no devolvió fuentes.'
+
+        async def run_async():
+            start = time.perf_counter()
+            return await aconsume(bot.astream_answer(query), start)
+        async_timeline, async_done = asyncio.run(run_async())
+        assert async_done['response'] == RESPONSE
+    print('\n--- 📊 Streaming vs respuesta bloqueante ---')
+    print(f"{'answer() (bloqueante)':<28} primer byte={blocking * 1000:>8.1f} ms")
+    for label, tl, result in (('stream_answer()', timeline, done), ('astream_answer()', async_timeline, async_done)):
+        print(f"{label:<28} fuentes={tl['sources'] * 1000:>8.1f} ms | primer token={result['ttft_seconds'] * 1000:>8.1f} ms | total={result['total_seconds'] * 1000:>8.1f} ms")
+    print('✅ Los tokens en streaming reconstruyen la respuesta y las fuentes llegan antes que el primer token.')
+if __name__ == '__main__':
+    configure_logging()
+    main()
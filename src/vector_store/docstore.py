@@ -0,0 +1,59 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Iterable, List
+from langchain_core.documents import Document
+from core.config import settings
+SQLITE_MAX_PARAMS = 900
+
+class ParentDocStore:
+
+    def __init__(self, path: str=None):
+        self.path = path or settings.PARENT_STORE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS parents (id TEXT PRIMARY KEY, page_content TEXT NOT NULL, metadata TEXT NOT NULL)')
+        self._conn.commit()
+
+    def put_many(self, docs: List[Document]):
+        rows = [(str(d.metadata['doc_id']), d.page_content, json.dumps(d.metadata, ensure_ascii=False)) for d in docs]
+        with self._lock:
+            self._conn.executemany('INSERT OR REPLACE INTO parents (id, page_content, metadata) VALUES (?, ?, ?)', rows)
+            self._conn.commit()
+
+    def get_many(self, ids: Iterable[str]) -> List[Document]:
+        ids = [str(i) for i in ids]
+        docs = []
+        with self._lock:
+            for i in range(0, len(ids), SQLITE_MAX_PARAMS):
+                chunk = ids[i:i + SQLITE_MAX_PARAMS]
+                placeholders = ','.join('?' * len(chunk))
+                cursor = self._conn.execute(f'SELECT page_content, metadata FROM parents WHERE id IN ({placeholders})', chunk)
+                docs.extend((Document(page_content=content, metadata=json.loads(metadata)) for content, metadata in cursor))
+        return docs
+
+    def delete_many(self, ids: Iterable[str]):
+        ids = [str(i) for i in ids]
+        with self._lock:
+            for i in range(0, len(ids), SQLITE_MAX_PARAMS):
+                chunk = ids[i:i + SQLITE_MAX_PARAMS]
+                self._conn.execute(f"DELETE FROM parents WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            self._conn.commit()
+
+    def clear(self, tenant: str=None, scoped: bool=False):
+        with self._lock:
+            if scoped:
+                self._conn.execute('DELETE FROM parents WHERE json_extract(metadata, ?) IS ?', (f'$.{settings.TENANT_FIELD}', tenant))
+            else:
+                self._conn.execute('DELETE FROM parents')
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM parents').fetchone()[0]
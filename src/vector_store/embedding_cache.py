@@ -0,0 +1,210 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from core.config import settings
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+KEY_BYTES = 16
+
+def text_key(text: str, namespace: str='d') -> bytes:
+    return hashlib.blake2b(f'{namespace}:{text}'.encode('utf-8'), digest_size=KEY_BYTES).digest()
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+@contextmanager
+def _file_lock(path: str):
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+class DiskEmbeddingStore:
+
+    def __init__(self, directory: str, dim: int, dtype: str='float16'):
+        self.directory = directory
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = self.dim * self.dtype.itemsize
+        self.keys_path = os.path.join(directory, 'keys.bin')
+        self.vectors_path = os.path.join(directory, 'vectors.bin')
+        self.lock_path = os.path.join(directory, 'write.lock')
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, int] = {}
+        self._rows = 0
+        self._mmap: Optional[np.memmap] = None
+        self._mapped_rows = 0
+        os.makedirs(directory, exist_ok=True)
+        self._check_meta()
+        self._load_index()
+
+    def _check_meta(self):
+        meta_path = os.path.join(self.directory, 'meta.json')
+        meta = {'dim': self.dim, 'dtype': self.dtype.name, 'key_bytes': KEY_BYTES}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored != meta:
+                raise ValueError(f'Caché de embeddings incompatible en {self.directory}: {stored} != {meta}')
+        else:
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+
+    def _available_rows(self) -> int:
+        return min(_file_size(self.keys_path) // KEY_BYTES, _file_size(self.vectors_path) // self.row_bytes)
+
+    def _load_index(self):
+        with _file_lock(self.lock_path):
+            rows = self._available_rows()
+            if rows * KEY_BYTES != _file_size(self.keys_path) or rows * self.row_bytes != _file_size(self.vectors_path):
+                self._truncate(rows)
+            self._refresh()
+
+    def _truncate(self, rows: int):
+        with open(self.keys_path, 'ab') as f:
+            f.truncate(rows * KEY_BYTES)
+        with open(self.vectors_path, 'ab') as f:
+            f.truncate(rows * self.row_bytes)
+
+    def _refresh(self):
+        rows = self._available_rows()
+        if rows <= self._rows:
+            return
+        with open(self.keys_path, 'rb') as f:
+            f.seek(self._rows * KEY_BYTES)
+            raw = f.read((rows - self._rows) * KEY_BYTES)
+        for i in range(0, len(raw), KEY_BYTES):
+            self._index.setdefault(raw[i:i + KEY_BYTES], self._rows + i // KEY_BYTES)
+        self._rows = rows
+
+    def _remap(self):
+        rows = self._rows
+        if rows and rows != self._mapped_rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=self.dtype, mode='r', shape=(rows, self.dim))
+            self._mapped_rows = rows
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get_many(self, keys: List[bytes]) -> List[Optional[np.ndarray]]:
+        with self._lock:
+            rows = [self._index.get(key) for key in keys]
+            if None in rows:
+                self._refresh()
+                rows = [self._index.get(key) for key in keys]
+            if any((row is not None and row >= self._mapped_rows for row in rows)):
+                self._remap()
+            return [None if row is None else np.asarray(self._mmap[row], dtype=np.float32) for row in rows]
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray):
+        with self._lock, _file_lock(self.lock_path):
+            self._refresh()
+            new = list({key: vec for key, vec in zip(keys, vectors) if key not in self._index}.items())
+            if not new:
+                return
+            block = np.asarray([vec for _, vec in new], dtype=self.dtype)
+            with open(self.vectors_path, 'ab') as f:
+                f.seek(0, os.SEEK_END)
+                first_row = f.tell() // self.row_bytes
+                f.write(block.tobytes())
+            with open(self.keys_path, 'ab') as f:
+                f.write(b''.join((key for key, _ in new)))
+            for i, (key, _) in enumerate(new):
+                self._index[key] = first_row + i
+            self._rows = first_row + len(new)
+
+class CachedEmbeddings(Embeddings):
+
+    def __init__(self, embeddings: Embeddings, model_name: str=None, cache_dir: str=None, dtype: str=None, query_cache_size: int=None, dim: int=None):
+        self.embeddings = embeddings
+        self.model_name = model_name or settings.EMBEDDING_MODEL_NAME
+        model_dir = re.sub('[^A-Za-z0-9_.-]+', '__', self.model_name)
+        directory = os.path.join(cache_dir or settings.EMBEDDING_CACHE_DIR, model_dir)
+        self.store = DiskEmbeddingStore(directory, dim or settings.VECTOR_SIZE, dtype or settings.EMBEDDING_CACHE_DTYPE)
+        self.query_cache_size = query_cache_size or settings.QUERY_EMBEDDING_CACHE_SIZE
+        self._query_cache: OrderedDict = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+
+    def _embed_with_store(self, texts: List[str], namespace: str, compute) -> List[List[float]]:
+        keys = [text_key(t, namespace) for t in texts]
+        cached = self.store.get_many(keys)
+        missing: Dict[bytes, str] = {}
+        for key, text, vec in zip(keys, texts, cached):
+            if vec is None:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - sum((1 for vec in cached if vec is None))
+        self.misses += len(missing)
+        if missing:
+            computed = np.asarray(compute(list(missing.values())), dtype=np.float32)
+            self.store.put_many(list(missing), computed)
+            fresh = dict(zip(missing, computed))
+            cached = [fresh[key] if vec is None else vec for key, vec in zip(keys, cached)]
+        return [vec.tolist() for vec in cached]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self._embed_with_store(texts, 'd', self.embeddings.embed_documents)
+
+    def _compute_queries(self, texts: List[str]) -> List[List[float]]:
+        if hasattr(self.embeddings, 'embed_queries'):
+            return self.embeddings.embed_queries(texts)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        results = [None] * len(texts)
+        missing = []
+        with self._query_lock:
+            for i, text in enumerate(texts):
+                if text in self._query_cache:
+                    self._query_cache.move_to_end(text)
+                    self.memory_hits += 1
+                    results[i] = self._query_cache[text]
+                else:
+                    missing.append(i)
+        if missing:
+            vectors = self._embed_with_store([texts[i] for i in missing], 'q', self._compute_queries)
+            with self._query_lock:
+                for i, vector in zip(missing, vectors):
+                    results[i] = vector
+                    self._query_cache[texts[i]] = vector
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.memory_hits + self.misses
+        return {'model': self.model_name, 'entries': len(self.store), 'hits': self.hits, 'memory_hits': self.memory_hits, 'misses': self.misses, 'hit_rate': (self.hits + self.memory_hits) / total if total else 0.0}
+
+def build_embeddings() -> Embeddings:
+    from langchain_huggingface import HuggingFaceEmbeddings
+    embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    if settings.EMBEDDING_CACHE_ENABLED:
+        embeddings = CachedEmbeddings(embeddings)
+    return embeddings
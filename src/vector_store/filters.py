@@ -0,0 +1,46 @@
+from datetime import date, datetime
+from typing import Dict, Iterable, List
+from qdrant_client.http import models
+from core.config import settings
+RANGE_KEYS = ('gt', 'gte', 'lt', 'lte')
+
+def tenant_collection(tenant: str=None) -> str:
+    if not tenant or settings.TENANT_ROUTING != 'collection':
+        return settings.COLLECTION_NAME
+    return f'{settings.COLLECTION_NAME}__{tenant}'
+
+def route_collections(tenants: Iterable[str]=None) -> List[str]:
+    if not tenants or settings.TENANT_ROUTING != 'collection':
+        return [settings.COLLECTION_NAME]
+    return list(dict.fromkeys((tenant_collection(t) for t in tenants)))
+
+def payload_index_schema(field: str, kind: str):
+    if kind == 'keyword':
+        return models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=field == settings.TENANT_FIELD and settings.TENANT_ROUTING == 'payload')
+    if kind == 'integer':
+        return models.IntegerIndexParams(type=models.IntegerIndexType.INTEGER, lookup=True, range=True)
+    return models.PayloadSchemaType(kind)
+
+def _is_temporal(value) -> bool:
+    return isinstance(value, (str, date, datetime))
+
+def field_condition(key: str, value) -> models.FieldCondition:
+    if isinstance(value, dict):
+        unknown = set(value) - set(RANGE_KEYS)
+        if unknown:
+            raise ValueError(f"Filtro de rango inválido para '{key}': claves {sorted(unknown)} (usa {', '.join(RANGE_KEYS)}).")
+        if any((_is_temporal(v) for v in value.values())):
+            return models.FieldCondition(key=key, range=models.DatetimeRange(**value))
+        return models.FieldCondition(key=key, range=models.Range(**value))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return models.FieldCondition(key=key, match=models.MatchAny(any=list(value)))
+    return models.FieldCondition(key=key, match=models.MatchValue(value=value))
+
+def build_conditions(filters: Dict[str, object]=None, tenants: Iterable[str]=None) -> List[models.FieldCondition]:
+    conditions = [field_condition(key, value) for key, value in (filters or {}).items() if value is not None]
+    if tenants and settings.TENANT_ROUTING == 'payload':
+        conditions.append(field_condition(settings.TENANT_FIELD, list(tenants)))
+    return conditions
+
+def unindexed_fields(filters: Dict[str, object]=None) -> List[str]:
+    return [key for key, value in (filters or {}).items() if value is not None and key not in settings.PAYLOAD_INDEX_FIELDS]
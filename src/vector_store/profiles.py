@@ -0,0 +1,35 @@
+from qdrant_client.http import models
+from core.config import settings
+BYTES_PER_FLOAT = 4
+
+def get_profile(name: str=None) -> dict:
+    name = name or settings.COLLECTION_PROFILE
+    if name not in settings.COLLECTION_PROFILES:
+        raise ValueError(f"Perfil de colección desconocido '{name}'. Opciones: {', '.join(settings.COLLECTION_PROFILES)}")
+    return {'name': name, **settings.COLLECTION_PROFILES[name]}
+
+def quantization_config(profile: dict):
+    if profile['quantization'] == 'int8':
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+    if profile['quantization'] == 'binary':
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def dense_vector_params(profile: dict) -> models.VectorParams:
+    return models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE, on_disk=profile['on_disk'])
+
+def collection_params(profile: dict) -> dict:
+    return {'hnsw_config': models.HnswConfigDiff(m=profile['hnsw_m'], ef_construct=profile['ef_construct']), 'quantization_config': quantization_config(profile), 'on_disk_payload': profile['on_disk_payload'], 'optimizers_config': models.OptimizersConfigDiff(indexing_threshold=settings.INDEXING_THRESHOLD)}
+
+def search_params(profile: dict):
+    if not profile['quantization']:
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(rescore=settings.QUANTIZATION_RESCORE, oversampling=profile.get('oversampling', 1.0)))
+
+def estimate_memory(profile: dict, num_vectors: int, dim: int=None) -> dict:
+    dim = dim or settings.VECTOR_SIZE
+    raw = num_vectors * dim * BYTES_PER_FLOAT
+    quantized = {'int8': num_vectors * dim, 'binary': num_vectors * dim // 8}.get(profile['quantization'], 0)
+    graph = num_vectors * profile['hnsw_m'] * 2 * BYTES_PER_FLOAT
+    ram = graph + quantized + (0 if profile['on_disk'] else raw)
+    return {'ram_bytes': ram, 'disk_bytes': raw if profile['on_disk'] else 0}
@@ -0,0 +1,43 @@
+import re
+import zlib
+import unicodedata
+from collections import Counter
+from typing import List
+from qdrant_client.http import models
+from core.config import settings
+_TOKEN_RE = re.compile('\\w(?:[\\w]|[.\\-/](?=\\w))*', re.UNICODE)
+STOPWORDS = frozenset('a al and are as at be by con de del e el en es for from in is la las lo los o of on or para por que se su sus the to un una y with'.split())
+
+def sparse_tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize('NFKD', text.lower())
+    text = ''.join((ch for ch in text if not unicodedata.combining(ch)))
+    return [t for t in _TOKEN_RE.findall(text) if t not in STOPWORDS]
+
+def token_index(token: str) -> int:
+    return zlib.crc32(token.encode('utf-8')) & 2147483647
+
+class BM25SparseEncoder:
+
+    def __init__(self, k1: float=1.2, b: float=0.75, avg_doc_len: float=None):
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len or settings.BM25_AVG_DOC_LEN
+
+    def _to_sparse(self, weights: dict) -> models.SparseVector:
+        merged = Counter()
+        for token, weight in weights.items():
+            merged[token_index(token)] += weight
+        indices = sorted(merged)
+        return models.SparseVector(indices=indices, values=[float(merged[i]) for i in indices])
+
+    def encode_document(self, text: str) -> models.SparseVector:
+        counts = Counter(sparse_tokenize(text))
+        doc_len = sum(counts.values())
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_len)
+        return self._to_sparse({token: tf * (self.k1 + 1) / (tf + norm) for token, tf in counts.items()})
+
+    def encode_documents(self, texts: List[str]) -> List[models.SparseVector]:
+        return [self.encode_document(t) for t in texts]
+
+    def encode_query(self, text: str) -> models.SparseVector:
+        return self._to_sparse({token: 1.0 for token in set(sparse_tokenize(text))})
@@ -1,40 +1,158 @@
 from typing import List
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from langchain_core.documents import Document
-from langchain_huggingface import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+from vector_store.embedding_cache import CachedEmbeddings
+from vector_store.docstore import ParentDocStore
+from vector_store.sparse import BM25SparseEncoder
+from vector_store.profiles import collection_params, dense_vector_params, get_profile
+from vector_store.filters import build_conditions, payload_index_schema, tenant_collection
 from core.config import settings
+from core.telemetry import get_echo, telemetry
+from core.resources import registry
+echo = get_echo(__name__)
 
 class VectorDBService:
 
-    def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL)
-        self.collection_name = settings.COLLECTION_NAME
-        print(f'🧠 Cargando modelo de embeddings: {settings.EMBEDDING_MODEL_NAME}...')
-        self.embeddings = HuggingFaceEmbeddings(model_name=settings.EMBEDDING_MODEL_NAME)
+    def __init__(self, client: QdrantClient=None, embeddings: Embeddings=None, parent_store: ParentDocStore=None, profile: str=None, tenant: str=None):
+        self.client = client if client else registry.qdrant_client()
+        self.tenant = tenant
+        self.collection_name = tenant_collection(tenant)
+        if parent_store is None and settings.PARENT_STORE == 'docstore':
+            parent_store = registry.parent_store()
+        self.parent_store = parent_store
+        self.hybrid = settings.HYBRID_SEARCH
+        self.sparse_encoder = BM25SparseEncoder() if self.hybrid else None
+        self.profile = get_profile(profile)
+        self.embeddings = embeddings if embeddings else registry.embeddings()
         self._ensure_collection_exists()
 
+    def _vectors_config(self):
+        dense = dense_vector_params(self.profile)
+        if not self.hybrid:
+            return {'vectors_config': dense}
+        return {'vectors_config': {settings.DENSE_VECTOR_NAME: dense}, 'sparse_vectors_config': {settings.SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF, index=models.SparseIndexParams(on_disk=self.profile['on_disk']))}}
+
     def _ensure_collection_exists(self):
         if not self.client.collection_exists(self.collection_name):
-            print(f"🔨 Creando colección '{self.collection_name}' en Qdrant...")
-            self.client.create_collection(collection_name=self.collection_name, vectors_config=models.VectorParams(size=settings.VECTOR_SIZE, distance=models.Distance.COSINE))
+            echo(f"🔨 Creando colección '{self.collection_name}' en Qdrant (perfil {self.profile['name']}{(', híbrida denso + BM25' if self.hybrid else '')})...")
+            self.client.create_collection(collection_name=self.collection_name, **self._vectors_config(), **collection_params(self.profile))
+            self._ensure_payload_indexes()
+            return
+        info = self.client.get_collection(self.collection_name)
+        self._ensure_payload_indexes(existing=info.payload_schema)
+        sparse_config = info.config.params.sparse_vectors
+        if self.hybrid and (not sparse_config or settings.SPARSE_VECTOR_NAME not in sparse_config):
+            echo(f"⚠️ La colección '{self.collection_name}' no tiene índice disperso; recréala (--recreate) para usar HYBRID_SEARCH.")
+
+    def _ensure_payload_indexes(self, existing=None):
+        for field, kind in settings.PAYLOAD_INDEX_FIELDS.items():
+            if existing and field in existing:
+                continue
+            self.client.create_payload_index(collection_name=self.collection_name, field_name=field, field_schema=payload_index_schema(field, kind))
+
+    def _set_indexing_threshold(self, threshold: int):
+        self.client.update_collection(collection_name=self.collection_name, optimizers_config=models.OptimizersConfigDiff(indexing_threshold=threshold))
+
+    @contextmanager
+    def bulk_indexing(self):
+        echo('⏸️ Indexación HNSW diferida durante la carga masiva (indexing_threshold=0).')
+        self._set_indexing_threshold(0)
+        try:
+            yield self
+        finally:
+            self._set_indexing_threshold(settings.INDEXING_THRESHOLD)
+            echo(f'▶️ Indexación HNSW restaurada (indexing_threshold={settings.INDEXING_THRESHOLD}).')
 
     def force_recreate_collection(self):
-        print(f"🧨 Borrando colección '{self.collection_name}'...")
-        self.client.delete_collection(self.collection_name)
+        if self.tenant and settings.TENANT_ROUTING == 'payload':
+            echo(f"🧨 Borrando los puntos del tenant '{self.tenant}' de la colección compartida '{self.collection_name}'...")
+            self.client.delete(collection_name=self.collection_name, points_selector=models.FilterSelector(filter=models.Filter(must=build_conditions(tenants=[self.tenant]))), wait=True)
+        else:
+            echo(f"🧨 Borrando colección '{self.collection_name}'...")
+            self.client.delete_collection(self.collection_name)
+        if self.parent_store is not None:
+            self.parent_store.clear(tenant=self.tenant, scoped=bool(self.tenant) or settings.TENANT_ROUTING == 'collection')
         self._ensure_collection_exists()
 
-    def upload_documents(self, docs: List[Document], batch_size=64):
+    def _build_points(self, batch: List[Document]) -> List[models.PointStruct]:
+        texts = [d.page_content for d in batch]
+        metadatas = [d.metadata for d in batch]
+        for j, meta in enumerate(metadatas):
+            meta['page_content'] = texts[j]
+        with telemetry.span('embedding.documents', texts=len(texts)):
+            vectors = self.embeddings.embed_documents(texts)
+        telemetry.incr('texts_embedded', len(texts))
+        if self.hybrid:
+            sparse_vectors = self.sparse_encoder.encode_documents(texts)
+            vectors = [{settings.DENSE_VECTOR_NAME: dense, settings.SPARSE_VECTOR_NAME: sparse} for dense, sparse in zip(vectors, sparse_vectors)]
+        return [models.PointStruct(id=str(meta.get('doc_id')), vector=vector, payload=meta) for vector, meta in zip(vectors, metadatas)]
+
+    def _upsert(self, points: List[models.PointStruct], wait: bool):
+        with telemetry.span('qdrant.upsert', points=len(points)):
+            self.client.upsert(collection_name=self.collection_name, points=points, wait=wait)
+        telemetry.incr('points_upserted', len(points))
+        return len(points)
+
+    def upload_documents(self, docs: List[Document], batch_size: int=None, upsert_batch_size: int=None, parallelism: int=None, wait: bool=None):
+        embed_batch_size = batch_size or settings.EMBED_BATCH_SIZE
+        upsert_batch_size = upsert_batch_size or settings.UPSERT_BATCH_SIZE
+        parallelism = settings.UPSERT_PARALLELISM if parallelism is None else parallelism
+        wait = settings.UPSERT_WAIT if wait is None else wait
+        if self.tenant:
+            for doc in docs:
+                doc.metadata[settings.TENANT_FIELD] = self.tenant
+        if self.parent_store is not None:
+            parents = [d for d in docs if d.metadata.get('type') == 'parent']
+            if parents:
+                self.parent_store.put_many(parents)
+                echo(f'🗄️ {len(parents)} padres guardados en el docstore local (sin vectorizar).')
+                docs = [d for d in docs if d.metadata.get('type') != 'parent']
         total_docs = len(docs)
-        print(f'🚀 Iniciando carga de {total_docs} documentos a Qdrant...')
-        for i in range(0, total_docs, batch_size):
+        echo(f'🚀 Iniciando carga de {total_docs} documentos a Qdrant (embed={embed_batch_size}, upsert={upsert_batch_size}, hilos={parallelism}, wait={wait})...')
+        if parallelism <= 0:
+            self._upload_lockstep(docs, embed_batch_size)
+        else:
+            self._upload_pipelined(docs, embed_batch_size, upsert_batch_size, parallelism, wait)
+        if isinstance(self.embeddings, CachedEmbeddings):
+            stats = self.embeddings.stats()
+            echo(f"💾 Caché de embeddings: {stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%}).")
+        echo('🎉 Ingestión completada exitosamente.')
+
+    def _upload_lockstep(self, docs: List[Document], batch_size: int):
+        for i in range(0, len(docs), batch_size):
             batch = docs[i:i + batch_size]
-            texts = [d.page_content for d in batch]
-            metadatas = [d.metadata for d in batch]
-            for j, meta in enumerate(metadatas):
-                meta['page_content'] = texts[j]
-            vectors = self.embeddings.embed_documents(texts)
-            points = [models.PointStruct(id=str(meta.get('doc_id')), vector=vector, payload=meta) for j, (vector, meta) in enumerate(zip(vectors, metadatas))]
-            self.client.upsert(collection_name=self.collection_name, points=points)
-            print(f'   ✅ Lote {i // batch_size + 1} subido ({len(batch)} docs).')
-        print('🎉 Ingestión completada exitosamente.')
\ No newline at end of file
+            self._upsert(self._build_points(batch), wait=True)
+            echo(f'   ✅ Lote {i // batch_size + 1} subido ({len(batch)} docs).')
+
+    def _upload_pipelined(self, docs: List[Document], embed_batch_size: int, upsert_batch_size: int, parallelism: int, wait: bool):
+        buffer = []
+        in_flight = []
+        uploaded = 0
+        with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='qdrant-upsert') as pool:
+            for i in range(0, len(docs), embed_batch_size):
+                buffer.extend(self._build_points(docs[i:i + embed_batch_size]))
+                is_last_batch = i + embed_batch_size >= len(docs)
+                while len(buffer) >= upsert_batch_size and (not is_last_batch or len(buffer) > upsert_batch_size):
+                    in_flight.append(pool.submit(self._upsert, buffer[:upsert_batch_size], wait))
+                    buffer = buffer[upsert_batch_size:]
+                    while len(in_flight) > parallelism * 2:
+                        uploaded += in_flight.pop(0).result()
+                echo(f'   ✅ Lote {i // embed_batch_size + 1} vectorizado ({min(embed_batch_size, len(docs) - i)} docs).')
+            for future in in_flight:
+                uploaded += future.result()
+        if buffer:
+            uploaded += self._upsert(buffer, wait=True)
+        echo(f'   📦 {uploaded} puntos confirmados por Qdrant.')
+
+    def delete_points(self, ids: List[str], batch_size=1000):
+        ids = list(ids)
+        if self.parent_store is not None:
+            self.parent_store.delete_many(ids)
+        for i in range(0, len(ids), batch_size):
+            self.client.delete(collection_name=self.collection_name, points_selector=models.PointIdsList(points=ids[i:i + batch_size]))
+        if ids:
+            echo(f'🗑️ Eliminados {len(ids)} puntos obsoletos de Qdrant.')